@@ -0,0 +1,175 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+# <<<netbox_agent_stats:sep(0)>>>
+# {"runtime": 0.865, "errors": 0, "endpoints": {"core/jobs/": {"requests": 2, "time": 0.412, "p95": 0.301, "bytes": 5989422, "errors": 0, "retries": 0}, "extras/scripts/": {"requests": 1, "time": 0.021, "p95": 0.021, "bytes": 9312, "errors": 0, "retries": 0}}, "circuit_breaker": "closed", "cache": {"hits": 1, "misses": 2}}
+
+from cmk.agent_based.v2 import (
+    check_levels,
+    Metric,
+    render,
+    Result,
+    Service,
+    State,
+    AgentSection,
+    CheckPlugin,
+)
+
+import json
+
+
+def parse_netbox_agent_stats(string_table):
+    if not string_table:
+        return None
+    return json.loads(string_table[0][0])
+
+
+agent_section_netbox_agent_stats = AgentSection(
+    name = 'netbox_agent_stats',
+    parse_function = parse_netbox_agent_stats,
+)
+
+
+def render_count(value):
+    return f'{value:.0f}'
+
+
+def discovery_netbox_agent_stats(section):
+    yield Service()
+
+
+def check_netbox_agent_stats(params, section):
+    endpoints = section['endpoints'].values()
+
+    if section.get('circuit_breaker') == 'open':
+        yield Result(state=State.WARN, summary='Circuit breaker open, serving cached data')
+
+    yield from check_levels(
+        value=section['runtime'],
+        levels_upper=params.get('runtime', None),
+        metric_name='netbox_runtime',
+        render_func=render.timespan,
+        label='Runtime',
+    )
+    yield from check_levels(
+        value=sum(endpoint['requests'] for endpoint in endpoints),
+        metric_name='netbox_requests',
+        render_func=render_count,
+        label='Requests',
+    )
+    yield from check_levels(
+        value=sum(endpoint['bytes'] for endpoint in endpoints),
+        metric_name='netbox_bytes',
+        render_func=render.bytes,
+        label='Received',
+    )
+    yield from check_levels(
+        value=section['errors'],
+        levels_upper=params.get('errors', None),
+        metric_name='netbox_errors',
+        render_func=render_count,
+        label='Errors',
+    )
+    yield from check_levels(
+        value=sum(endpoint['retries'] for endpoint in endpoints),
+        metric_name='netbox_retries',
+        render_func=render_count,
+        label='Retries',
+        notice_only=True,
+    )
+
+    yield Result(state=State.OK, notice=f"HTTP cache hits: {section['cache']['hits']}, misses: {section['cache']['misses']}")
+    yield Metric('netbox_cache_hits', section['cache']['hits'])
+    yield Metric('netbox_cache_misses', section['cache']['misses'])
+
+
+check_plugin_netbox_agent_stats = CheckPlugin(
+    name = 'netbox_agent_stats',
+    service_name = 'Netbox Agent',
+    discovery_function = discovery_netbox_agent_stats,
+    check_function = check_netbox_agent_stats,
+    check_ruleset_name = 'netbox_agent_stats',
+    check_default_parameters = {'errors': ('fixed', (1, 10))},
+)
+
+
+def discovery_netbox_agent_endpoint(section):
+    for endpoint in section['endpoints']:
+        yield Service(item=endpoint)
+
+
+def check_netbox_agent_endpoint(item, params, section):
+    if item not in section['endpoints']:
+        # Endpoints like core/jobs/ are skipped while cached jobs are current.
+        yield Result(state=State.OK, summary='No requests this run')
+        yield Metric('netbox_requests', 0)
+        return
+
+    endpoint = section['endpoints'][item]
+
+    yield from check_levels(
+        value=endpoint['requests'],
+        metric_name='netbox_requests',
+        render_func=render_count,
+        label='Requests',
+    )
+    yield from check_levels(
+        value=endpoint['time'],
+        metric_name='netbox_request_time',
+        render_func=render.timespan,
+        label='Total time',
+    )
+    yield from check_levels(
+        value=endpoint['p95'],
+        levels_upper=params.get('latency', None),
+        metric_name='netbox_request_latency',
+        render_func=render.timespan,
+        label='95th percentile latency',
+    )
+    yield from check_levels(
+        value=endpoint['bytes'],
+        metric_name='netbox_bytes',
+        render_func=render.bytes,
+        label='Received',
+    )
+    yield from check_levels(
+        value=endpoint['errors'],
+        levels_upper=params.get('errors', None),
+        metric_name='netbox_errors',
+        render_func=render_count,
+        label='Errors',
+    )
+    yield from check_levels(
+        value=endpoint['retries'],
+        metric_name='netbox_retries',
+        render_func=render_count,
+        label='Retries',
+        notice_only=True,
+    )
+
+
+check_plugin_netbox_agent_endpoint = CheckPlugin(
+    name = 'netbox_agent_endpoint',
+    sections = ['netbox_agent_stats'],
+    service_name = 'Netbox Agent Endpoint %s',
+    discovery_function = discovery_netbox_agent_endpoint,
+    check_function = check_netbox_agent_endpoint,
+    check_ruleset_name = 'netbox_agent_endpoint',
+    check_default_parameters = {'errors': ('fixed', (1, 10))},
+)
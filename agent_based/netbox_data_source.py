@@ -19,6 +19,10 @@
 
 # <<<netbox_data_source>>>
 # {"name": "test", "description": "test", "enabled": true, "status": {"value": "completed", "label": "Completed"}, "last_updated": "2023-05-03T13:13:29.965921+02:00", "file_count": 1}
+#
+# If Netbox was unavailable the agent repeats the last good section after a
+# line with the time it was fetched:
+# {"cached": 1683112409.965921}
 
 from cmk.agent_based.v2 import (
     check_levels,
@@ -32,20 +36,46 @@ from cmk.agent_based.v2 import (
 )
 
 import json
+from dataclasses import dataclass
 from datetime import datetime
 
 
+@dataclass(slots=True)
+class DataSource:
+    name: str
+    description: str
+    enabled: bool
+    status: str
+    status_label: str
+    last_synced: datetime | None
+    file_count: int
+    cached: datetime | None = None
+
+
 def parse_netbox_data_source(string_table):
     parsed = {}
+    cached = None
 
     for line in string_table:
         data = json.loads(line[0])
 
-        if 'last_synced' in data:
-            data['last_synced'] = datetime.fromisoformat(data['last_synced']).replace(tzinfo=None)
-
-        parsed[data['name']] = data
-
+        if 'name' not in data:
+            cached = datetime.fromtimestamp(data['cached'])
+            continue
+
+        parsed[data['name']] = DataSource(
+            name=data['name'],
+            description=data['description'],
+            enabled=data['enabled'],
+            status=data['status']['value'],
+            status_label=data['status']['label'],
+            last_synced=datetime.fromisoformat(data['last_synced']).replace(tzinfo=None) if data.get('last_synced') else None,
+            file_count=data['file_count'],
+        )
+
+    if cached:
+        for data_source in parsed.values():
+            data_source.cached = cached
     return parsed
 
 
@@ -64,19 +94,30 @@ def check_netbox_data_source(item, params, section):
 
     data_source = section[item]
 
-    if data_source['status']['value'] == 'Failed':
-        yield Result(state = State.CRIT, summary = f"Status is {data_source['status']['label']}")
+    if data_source.status == 'failed':
+        yield Result(state = State.CRIT, summary = f"Status is {data_source.status_label}")
 
     now = datetime.now()
-    age = now - data_source['last_synced']
-    yield from check_levels(
-        value=age.total_seconds(),
-        levels_upper=params.get('maxage', None),
-        render_func=lambda f: render.timespan(f if f > 0 else -f),
-        label='Last Sync' if age.total_seconds() > 0 else "Last Sync in",
-    )
-
-    yield Metric('file', data_source['file_count'])
+    if data_source.cached:
+        yield from check_levels(
+            value=(now - data_source.cached).total_seconds(),
+            levels_upper=params.get('cache_age', None),
+            render_func=render.timespan,
+            label='Netbox unavailable, data age',
+        )
+
+    if data_source.last_synced is None:
+        yield Result(state=State.UNKNOWN, summary=f"DataSource \"{item}\" not yet synced")
+    else:
+        age = now - data_source.last_synced
+        yield from check_levels(
+            value=age.total_seconds(),
+            levels_upper=params.get('maxage', None),
+            render_func=lambda f: render.timespan(f if f > 0 else -f),
+            label='Last Sync' if age.total_seconds() > 0 else "Last Sync in",
+        )
+
+    yield Metric('file', data_source.file_count)
 
 
 check_plugin_netbox_data_source = CheckPlugin(
@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+# <<<netbox_job_queue:sep(0)>>>
+# {"name": "netbox.example.com", "pending": 3, "oldest_pending": "2024-07-02T06:50:00+02:00", "scheduled": 12, "running": 2, "workers": 2}
+#
+# The agent writes one line per Netbox instance with the number of jobs in
+# each status, the creation time of the oldest pending job and the number
+# of running RQ workers from /api/status/.
+
+from cmk.agent_based.v2 import (
+    check_levels,
+    render,
+    Service,
+    AgentSection,
+    CheckPlugin,
+)
+
+import json
+from datetime import datetime
+from typing import NamedTuple
+
+
+class JobQueue(NamedTuple):
+    pending: int
+    scheduled: int
+    running: int
+    workers: int
+    oldest_pending: datetime | None
+
+
+def parse_netbox_job_queue(string_table):
+    parsed = {}
+    for line in string_table:
+        data = json.loads(line[0])
+        oldest_pending = data['oldest_pending']
+        parsed[data['name']] = JobQueue(
+            pending=data['pending'],
+            scheduled=data['scheduled'],
+            running=data['running'],
+            workers=data['workers'],
+            oldest_pending=datetime.fromisoformat(oldest_pending).replace(tzinfo=None) if oldest_pending else None,
+        )
+    return parsed
+
+
+agent_section_netbox_job_queue = AgentSection(
+    name = 'netbox_job_queue',
+    parse_function = parse_netbox_job_queue,
+)
+
+
+def render_count(value):
+    return f'{value:.0f}'
+
+
+def discovery_netbox_job_queue(section):
+    for name in section:
+        yield Service(item=name)
+
+
+def check_netbox_job_queue(item, params, section):
+    if item not in section:
+        return
+
+    queue = section[item]
+
+    yield from check_levels(
+        value=queue.pending,
+        levels_upper=params.get('pending', None),
+        metric_name='netbox_jobs_pending',
+        render_func=render_count,
+        label='Pending jobs',
+    )
+    yield from check_levels(
+        value=(datetime.now() - queue.oldest_pending).total_seconds() if queue.oldest_pending else 0,
+        levels_upper=params.get('oldest_pending', None),
+        metric_name='netbox_job_wait',
+        render_func=render.timespan,
+        label='Oldest pending job waiting',
+    )
+    yield from check_levels(
+        value=queue.running,
+        metric_name='netbox_jobs_running',
+        render_func=render_count,
+        label='Running jobs',
+    )
+    yield from check_levels(
+        value=queue.scheduled,
+        metric_name='netbox_jobs_scheduled',
+        render_func=render_count,
+        label='Scheduled jobs',
+        notice_only=True,
+    )
+    yield from check_levels(
+        value=queue.workers,
+        levels_lower=params.get('workers', None),
+        metric_name='netbox_rq_workers',
+        render_func=render_count,
+        label='RQ workers',
+    )
+    if queue.workers:
+        yield from check_levels(
+            value=100.0 * queue.running / queue.workers,
+            levels_upper=params.get('utilization', None),
+            metric_name='netbox_rq_worker_utilization',
+            render_func=render.percent,
+            label='Worker utilization',
+        )
+
+
+check_plugin_netbox_job_queue = CheckPlugin(
+    name = 'netbox_job_queue',
+    service_name = 'Netbox Job Queue %s',
+    discovery_function = discovery_netbox_job_queue,
+    check_function = check_netbox_job_queue,
+    check_ruleset_name = 'netbox_job_queue',
+    check_default_parameters = {
+        'oldest_pending': ('fixed', (300.0, 900.0)),
+        'workers': ('fixed', (1, 1)),
+    },
+)
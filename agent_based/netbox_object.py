@@ -0,0 +1,84 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+# <<<<sw01.example.com>>>>
+# <<<netbox_object:sep(0)>>>
+# {"type": "device", "id": 17, "status": {"value": "active", "label": "Active"}, "site": "HQ"}
+# <<<<>>>>
+
+from cmk.agent_based.v2 import (
+    Result,
+    Service,
+    State,
+    AgentSection,
+    CheckPlugin,
+)
+
+import json
+
+OBJECT_TYPES = {
+    'device': 'Device',
+    'virtual_machine': 'Virtual machine',
+}
+
+
+def parse_netbox_object(string_table):
+    if not string_table:
+        return None
+    return json.loads(string_table[0][0])
+
+
+agent_section_netbox_object = AgentSection(
+    name = 'netbox_object',
+    parse_function = parse_netbox_object,
+)
+
+
+def discovery_netbox_object(section):
+    yield Service()
+
+
+def check_netbox_object(params, section):
+    status = section['status']
+    yield Result(
+        state=State(params.get(status['value'], params['other'])),
+        summary=f"{OBJECT_TYPES.get(section['type'], section['type'])} status: {status['label']}",
+    )
+    if section.get('site'):
+        yield Result(state=State.OK, summary=f"Site: {section['site']}")
+
+
+check_plugin_netbox_object = CheckPlugin(
+    name = 'netbox_object',
+    service_name = 'Netbox Status',
+    discovery_function = discovery_netbox_object,
+    check_function = check_netbox_object,
+    check_ruleset_name = 'netbox_object',
+    check_default_parameters = {
+        'active': State.OK.value,
+        'planned': State.WARN.value,
+        'staged': State.WARN.value,
+        'inventory': State.WARN.value,
+        'decommissioning': State.WARN.value,
+        'offline': State.CRIT.value,
+        'failed': State.CRIT.value,
+        'other': State.UNKNOWN.value,
+    },
+)
@@ -17,15 +17,22 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-# <<<netbox_script>>>
-# dellos6.DellOS6Report,DellOS6Report,test_device
-# dellos6.DellOS6Report,DellOS6Report,test_interface
-# devices.DeviceConnectionsReport,DeviceConnectionsReport,test_power_connections
-# dhcp.DhcpReport,DhcpReport,test_pool_is_in_prefix,2023-01-04T08:00:01.134531+01:00,0,0,41,0
-# dhcp.DhcpReport,DhcpReport,test_prefix_has_pool,2023-01-04T08:00:01.134531+01:00,0,0,41,0
-# ipam.IpAddressReport,IpAddressReport,test_name_or_description,2022-12-22T14:20:32.555035+01:00,0,23,0,0
-# ipam.PrefixReport,PrefixReport,test_broadcast_reservation,2022-12-21T16:01:17.599839+01:00,0,0,101,0
-# ipam.PrefixReport,PrefixReport,test_no_subprefix_in_active,2022-12-21T16:01:17.599839+01:00,0,1,100,0
+# <<<netbox_script:sep(0)>>>
+# {"name": "DeviceConnectionsReport"}
+# {"name": "DhcpReport", "status": "completed", "completed": "2023-01-04T08:00:01.134531+01:00", "tests": {"test_pool_is_in_prefix": [0, 0, 41, 0], "test_prefix_has_pool": [0, 0, 41, 0]}, "runtime": 12.5, "queue_wait": 0.8}
+# {"name": "IpAddressReport", "status": "completed", "completed": "2022-12-22T14:20:32.555035+01:00", "tests": {"test_name_or_description": [0, 23, 0, 0]}}
+#
+# The counters of a test are info, success, warning and failure. The runtime
+# and the wait for a worker of the job are in seconds. If Netbox
+# was unavailable the agent repeats the last good section after a line with
+# the time it was fetched:
+# {"cached": 1672815601.134531}
+#
+# Older agents wrote one row per script and test, which is still parsed:
+# <<<netbox_script:sep(44)>>>
+# DeviceConnectionsReport
+# DhcpReport,,completed,2023-01-04T08:00:01.134531+01:00
+# DhcpReport,test_pool_is_in_prefix,completed,2023-01-04T08:00:01.134531+01:00,0,0,41,0
 
 from cmk.agent_based.v2 import (
     check_levels,
@@ -38,32 +45,94 @@ from cmk.agent_based.v2 import (
     CheckPlugin,
 )
 
+import json
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple
+
+
+class Counters(NamedTuple):
+    info: int = 0
+    success: int = 0
+    warning: int = 0
+    failure: int = 0
+
+
+@dataclass(slots=True)
+class Script:
+    name: str
+    state: str | None = None
+    last_run: datetime | None = None
+    tests: dict[str, Counters] = field(default_factory=dict)
+    totals: Counters = Counters()
+    runtime: float | None = None
+    queue_wait: float | None = None
+    cached: datetime | None = None
+
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value).replace(tzinfo=None)
 
 
 def parse_netbox_script(string_table):
     parsed = {}
+    cached = None
+    # Scripts of one schedule share their completion time and old rows repeat
+    # it for every test, so each distinct timestamp is only parsed once.
+    timestamp = lru_cache(maxsize=None)(parse_timestamp)
 
     for line in string_table:
-        script = parsed.setdefault(line[0], dict(name=line[0]))
-
-        if len(line) > 3:
-            script.update(dict(
-                state=line[2],
-                last_run=datetime.fromisoformat(line[3]).replace(tzinfo=None),
-            ))
-
-        if len(line) > 7:
-            test = script.setdefault('tests', {})
-            test[line[1]] = dict(
-                info=int(line[4]),
-                success=int(line[5]),
-                warning=int(line[6]),
-                failure=int(line[7]),
-            )
+        if line[0].startswith('{'):
+            record = json.loads(','.join(line))
+            if 'name' not in record:
+                cached = datetime.fromtimestamp(record['cached'])
+            else:
+                parse_script_record(parsed, record, timestamp)
+            continue
+
+        if line[0] == '@cached':
+            cached = datetime.fromtimestamp(float(line[1]))
+            continue
+        parse_script_row(parsed, line, timestamp)
+
+    for script in parsed.values():
+        if script.tests:
+            script.totals = Counters(*map(sum, zip(*script.tests.values())))
+        script.cached = cached
     return parsed
 
 
+def parse_script_record(parsed, record, timestamp):
+    script = parsed.setdefault(record['name'], Script(record['name']))
+
+    if 'completed' in record:
+        script.state = record['status']
+        script.last_run = timestamp(record['completed'])
+
+    script.runtime = record.get('runtime')
+    script.queue_wait = record.get('queue_wait')
+
+    if record.get('tests'):
+        script.tests = {
+            test_name: Counters(*counters)
+            for test_name, counters in record['tests'].items()
+        }
+
+
+def parse_script_row(parsed, line, timestamp):
+    script = parsed.get(line[0])
+    if script is None:
+        script = parsed[line[0]] = Script(line[0])
+
+    if len(line) > 3:
+        script.state = line[2]
+        script.last_run = timestamp(line[3])
+
+    if len(line) > 7:
+        script.tests[line[1]] = Counters(int(line[4]), int(line[5]), int(line[6]), int(line[7]))
+
+
 agent_section_netbox_script = AgentSection(
     name = "netbox_script",
     parse_function = parse_netbox_script,
@@ -82,10 +151,18 @@ def check_netbox_script(item, params, section):
     script = section[item]
 
     now = datetime.now()
-    if 'last_run' not in script:
+    if script.cached:
+        yield from check_levels(
+            value=(now - script.cached).total_seconds(),
+            levels_upper=params.get('cache_age', None),
+            render_func=render.timespan,
+            label='Netbox unavailable, data age',
+        )
+
+    if script.last_run is None:
         yield Result(state=State.UNKNOWN, summary=(f"Report \"{item}\" not yet executed"))
     else:
-        age = now - script['last_run']
+        age = now - script.last_run
         yield from check_levels(
             value=age.total_seconds(),
             levels_upper=params.get('maxage', None),
@@ -93,26 +170,39 @@ def check_netbox_script(item, params, section):
             label='Last Run' if age.total_seconds() > 0 else "Last Run in",
         )
 
-    if 'tests' in script:
-        info = success = warning = failure = 0
-        for test_name, test_result in script['tests'].items():
-            info += test_result['info']
-            success += test_result['success']
-            warning += test_result['warning']
-            failure += test_result['failure']
+    if script.runtime is not None:
+        yield from check_levels(
+            value=script.runtime,
+            levels_upper=params.get('runtime', None),
+            metric_name='netbox_script_runtime',
+            render_func=render.timespan,
+            label='Runtime',
+        )
+
+    if script.queue_wait is not None:
+        yield from check_levels(
+            value=script.queue_wait,
+            levels_upper=params.get('queue_wait', None),
+            metric_name='netbox_script_queue_wait',
+            render_func=render.timespan,
+            label='Queue wait',
+            notice_only=True,
+        )
 
-            if test_result['warning'] > 0:
+    if script.tests:
+        for test_name, test_result in script.tests.items():
+            if test_result.warning > 0:
                 yield Result(state = State.WARN,
-                             summary = f"{test_name} Warning: {test_result['warning']}")
+                             summary = f"{test_name} Warning: {test_result.warning}")
 
-            if test_result['failure'] > 0:
+            if test_result.failure > 0:
                 yield Result(state = State.WARN,
-                             summary = f"{test_name} Failure: {test_result['failure']}")
+                             summary = f"{test_name} Failure: {test_result.failure}")
 
-        yield Metric('test_info', info)
-        yield Metric('test_success', success)
-        yield Metric('test_warning', warning)
-        yield Metric('test_failure', failure)
+        yield Metric('test_info', script.totals.info)
+        yield Metric('test_success', script.totals.success)
+        yield Metric('test_warning', script.totals.warning)
+        yield Metric('test_failure', script.totals.failure)
 
 
 check_plugin_netbox_script = CheckPlugin(
@@ -0,0 +1,126 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from cmk.graphing.v1 import graphs, metrics, perfometers
+
+metric_netbox_runtime = metrics.Metric(
+    name='netbox_runtime',
+    title=metrics.Title('Agent runtime'),
+    unit=metrics.Unit(metrics.TimeNotation()),
+    color=metrics.Color.BLUE,
+)
+
+metric_netbox_requests = metrics.Metric(
+    name='netbox_requests',
+    title=metrics.Title('Requests'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.GREEN,
+)
+
+metric_netbox_errors = metrics.Metric(
+    name='netbox_errors',
+    title=metrics.Title('Errors'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.RED,
+)
+
+metric_netbox_retries = metrics.Metric(
+    name='netbox_retries',
+    title=metrics.Title('Retries'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.ORANGE,
+)
+
+metric_netbox_bytes = metrics.Metric(
+    name='netbox_bytes',
+    title=metrics.Title('Received'),
+    unit=metrics.Unit(metrics.IECNotation("B")),
+    color=metrics.Color.PURPLE,
+)
+
+metric_netbox_cache_hits = metrics.Metric(
+    name='netbox_cache_hits',
+    title=metrics.Title('HTTP cache hits'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.LIGHT_GREEN,
+)
+
+metric_netbox_cache_misses = metrics.Metric(
+    name='netbox_cache_misses',
+    title=metrics.Title('HTTP cache misses'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.LIGHT_GRAY,
+)
+
+metric_netbox_request_time = metrics.Metric(
+    name='netbox_request_time',
+    title=metrics.Title('Total request time'),
+    unit=metrics.Unit(metrics.TimeNotation()),
+    color=metrics.Color.DARK_BLUE,
+)
+
+metric_netbox_request_latency = metrics.Metric(
+    name='netbox_request_latency',
+    title=metrics.Title('95th percentile request latency'),
+    unit=metrics.Unit(metrics.TimeNotation()),
+    color=metrics.Color.LIGHT_BLUE,
+)
+
+graph_netbox_agent_requests = graphs.Graph(
+    name='netbox_agent_requests',
+    title=graphs.Title('Netbox requests'),
+    minimal_range=graphs.MinimalRange(0, 1),
+    simple_lines=[
+        'netbox_requests',
+        'netbox_errors',
+        'netbox_retries',
+    ],
+)
+
+graph_netbox_agent_cache = graphs.Graph(
+    name='netbox_agent_cache',
+    title=graphs.Title('Netbox HTTP cache'),
+    minimal_range=graphs.MinimalRange(0, 1),
+    compound_lines=[
+        'netbox_cache_hits',
+        'netbox_cache_misses',
+    ],
+)
+
+graph_netbox_request_time = graphs.Graph(
+    name='netbox_request_time',
+    title=graphs.Title('Netbox request time'),
+    minimal_range=graphs.MinimalRange(0, 1),
+    simple_lines=[
+        'netbox_request_time',
+        'netbox_request_latency',
+    ],
+)
+
+perfometer_netbox_runtime = perfometers.Perfometer(
+    name='netbox_runtime',
+    focus_range=perfometers.FocusRange(perfometers.Closed(0), perfometers.Open(60)),
+    segments=['netbox_runtime'],
+)
+
+perfometer_netbox_request_latency = perfometers.Perfometer(
+    name='netbox_request_latency',
+    focus_range=perfometers.FocusRange(perfometers.Closed(0), perfometers.Open(1)),
+    segments=['netbox_request_latency'],
+)
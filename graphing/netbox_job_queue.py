@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+
+from cmk.graphing.v1 import graphs, metrics, perfometers
+
+metric_netbox_jobs_pending = metrics.Metric(
+    name='netbox_jobs_pending',
+    title=metrics.Title('Pending jobs'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.ORANGE,
+)
+
+metric_netbox_jobs_running = metrics.Metric(
+    name='netbox_jobs_running',
+    title=metrics.Title('Running jobs'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.GREEN,
+)
+
+metric_netbox_jobs_scheduled = metrics.Metric(
+    name='netbox_jobs_scheduled',
+    title=metrics.Title('Scheduled jobs'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.LIGHT_BLUE,
+)
+
+metric_netbox_job_wait = metrics.Metric(
+    name='netbox_job_wait',
+    title=metrics.Title('Wait of the oldest pending job'),
+    unit=metrics.Unit(metrics.TimeNotation()),
+    color=metrics.Color.PURPLE,
+)
+
+metric_netbox_rq_workers = metrics.Metric(
+    name='netbox_rq_workers',
+    title=metrics.Title('RQ workers'),
+    unit=metrics.Unit(metrics.DecimalNotation("")),
+    color=metrics.Color.BLUE,
+)
+
+metric_netbox_rq_worker_utilization = metrics.Metric(
+    name='netbox_rq_worker_utilization',
+    title=metrics.Title('RQ worker utilization'),
+    unit=metrics.Unit(metrics.DecimalNotation("%")),
+    color=metrics.Color.DARK_GREEN,
+)
+
+graph_netbox_job_queue = graphs.Graph(
+    name='netbox_job_queue',
+    title=graphs.Title('Netbox job queue'),
+    minimal_range=graphs.MinimalRange(0, 1),
+    compound_lines=[
+        'netbox_jobs_running',
+        'netbox_jobs_pending',
+    ],
+    simple_lines=[
+        'netbox_rq_workers',
+    ],
+)
+
+graph_netbox_job_wait = graphs.Graph(
+    name='netbox_job_wait',
+    title=graphs.Title('Netbox job wait'),
+    minimal_range=graphs.MinimalRange(0, 1),
+    simple_lines=[
+        'netbox_job_wait',
+    ],
+)
+
+perfometer_netbox_job_queue = perfometers.Perfometer(
+    name='netbox_job_queue',
+    focus_range=perfometers.FocusRange(perfometers.Closed(0), perfometers.Open(10)),
+    segments=['netbox_jobs_pending'],
+)
@@ -47,6 +47,20 @@ metric_test_failure = metrics.Metric(
     color=metrics.Color.RED,
 )
 
+metric_netbox_script_runtime = metrics.Metric(
+    name='netbox_script_runtime',
+    title=metrics.Title('Runtime'),
+    unit=metrics.Unit(metrics.TimeNotation()),
+    color=metrics.Color.BLUE,
+)
+
+metric_netbox_script_queue_wait = metrics.Metric(
+    name='netbox_script_queue_wait',
+    title=metrics.Title('Queue wait'),
+    unit=metrics.Unit(metrics.TimeNotation()),
+    color=metrics.Color.ORANGE,
+)
+
 graph_netbox_script = graphs.Graph(
     name='netbox_script',
     title=graphs.Title('netbox Script'),
@@ -59,6 +73,18 @@ graph_netbox_script = graphs.Graph(
     ],
 )
 
+graph_netbox_script_duration = graphs.Graph(
+    name='netbox_script_duration',
+    title=graphs.Title('netbox Script duration'),
+    minimal_range=graphs.MinimalRange(0, 1),
+    simple_lines=[
+        'netbox_script_runtime',
+        'netbox_script_queue_wait',
+        metrics.WarningOf('netbox_script_runtime'),
+        metrics.CriticalOf('netbox_script_runtime'),
+    ],
+)
+
 perfometer_netbox_script = perfometers.Perfometer(
     name='netbox_script',
     focus_range=perfometers.FocusRange(perfometers.Closed(0), perfometers.Open(1)),
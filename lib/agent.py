@@ -17,33 +17,125 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+import hashlib
+import importlib.util
+import itertools
+import json
 import logging
-import requests
+import re
+import sys
+import time
+from argparse import ArgumentTypeError, Namespace
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from functools import cached_property
+from typing import NamedTuple
+from urllib.parse import urlsplit
 
-from cmk.special_agents.v0_unstable.agent_common import (
-    SectionWriter,
-    special_agent_main,
-)
-from cmk.special_agents.v0_unstable.argument_parsing import (
-    Args,
-    create_default_argument_parser
-)
+from cmk_addons.plugins.netbox.lib.cache import cache_key, JobStore, ObjectCache, SectionCache, SpoolFile
+from cmk_addons.plugins.netbox.lib.jsonstream import PageStream
+from cmk_addons.plugins.netbox.lib.stats import AgentStats
 
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+def lazy_import(name):
+    '''Return module name, loaded only when one of its attributes is used first.'''
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# The HTTP stack is a large part of the start time of the agent, so it is
+# only loaded once Netbox is queried.
+requests = lazy_import('requests')
+transport = lazy_import('cmk_addons.plugins.netbox.lib.transport')
+urllib3 = lazy_import('urllib3')
+# Neither are the special agent helpers of Checkmk, which are only needed
+# once the agent is run and not by modules importing the agent.
+agent_common = lazy_import('cmk.special_agents.v0_unstable.agent_common')
+argument_parsing = lazy_import('cmk.special_agents.v0_unstable.argument_parsing')
 
 LOGGING = logging.getLogger('agent_netbox')
 
+CHUNK_SIZE = 64 * 1024
+
+# Fields requested from Netbox, everything else is neither sent nor kept.
+SCRIPT_FIELDS = ('id', 'name')
+DATA_SOURCE_FIELDS = ('id', 'name', 'description', 'enabled', 'status', 'last_synced', 'last_updated', 'file_count')
+JOB_FIELDS = ('id', 'object_id', 'status', 'created', 'scheduled', 'interval', 'started', 'completed')
+OBJECT_FIELDS = ('id', 'name', 'status', 'site')
+# Seconds a scheduled run may be overdue beyond its interval before it is ignored.
+SCHEDULE_GRACE = 600
+# Jobs waiting for or held by an RQ worker.
+QUEUED_JOB_STATUS = ('pending', 'scheduled', 'running')
+
+# Objects which can be written as piggyback hosts: option -> (object type, endpoint)
+PIGGYBACK_OBJECTS = {
+    'devices': ('device', 'dcim/devices/'),
+    'virtual-machines': ('virtual_machine', 'virtualization/virtual-machines/'),
+}
+
+
+class Section(NamedTuple):
+    '''Agent section collected from Netbox, written once all instances are done.'''
+    name: str
+    records: list
+    separator: str = '\0'
+    as_json: bool = False
+    cached: float | None = None
+    host: str | None = None
+
+
+# Regular expressions made of these match the same in Python and PostgreSQL.
+PORTABLE_REGEX = re.compile(r'(?:[\w .*+?^$|(){},\[\]-]|\\\W)*')
+
+
+def portable_regex(pattern):
+    '''Whether pattern can be sent to Netbox as name__regex filter.
+
+    Netbox answers 400 for syntax PostgreSQL does not know, like (?i) or
+    lookbehinds, so only plain patterns are sent. NameFilter applies every
+    pattern locally anyway.
+    '''
+    return bool(pattern) and '(?' not in pattern and PORTABLE_REGEX.fullmatch(pattern) is not None
+
+
+class NameFilter:
+    '''Match names containing the include and none of the exclude regular expression.'''
+
+    def __init__(self, include=None, exclude=None):
+        self.include = re.compile(include) if include else None
+        self.exclude = re.compile(exclude) if exclude else None
+
+    def __call__(self, name):
+        if self.include and not self.include.search(name):
+            return False
+        return not (self.exclude and self.exclude.search(name))
+
+
+GRAPHQL_QUERY = '''
+query {
+  script_list { id name }
+  data_source_list { id name description enabled status last_synced datafiles { id } }
+}
+'''
+
 
 class AgentNetbox:
     '''Checkmk special Agent for Netbox'''
 
     def run(self):
-        special_agent_main(self.parse_arguments, self.main)
+        agent_common.special_agent_main(self.parse_arguments, self.main)
 
     def parse_arguments(self, argv):
-        parser = create_default_argument_parser(description=self.__doc__)
+        return self.argument_parser().parse_args(argv)
+
+    def argument_parser(self):
+        parser = argument_parsing.create_default_argument_parser(description=self.__doc__)
 
         parser.add_argument('-U', '--url',
                             dest='url',
@@ -55,105 +147,713 @@ class AgentNetbox:
                             help='Netbox token.')
         parser.add_argument('-t', '--timeout',
                             dest='timeout',
+                            type=float,
                             required=False,
                             default=10,
-                            help='HTTP connection timeout. (Default: 10)')
+                            help='HTTP read timeout in seconds. (Default: 10)')
+        parser.add_argument('--connect-timeout',
+                            dest='connect_timeout',
+                            type=float,
+                            default=5,
+                            help='HTTP connect timeout in seconds. (Default: 5)')
+        parser.add_argument('--retries',
+                            dest='retries',
+                            type=int,
+                            default=3,
+                            help='Retries of a request after a connection error, a 5xx or a 429 response, '
+                                 'with exponential backoff and honouring Retry-After up to 30 seconds. (Default: 3)')
+        parser.add_argument('--time-budget',
+                            dest='time_budget',
+                            type=float,
+                            default=0,
+                            help='Seconds the agent may spend on requests per run, 0 for no limit. Sections which '
+                                 'could not be fetched in time are answered with the last good data. (Default: 0)')
+        parser.add_argument('--breaker-threshold',
+                            dest='breaker_threshold',
+                            type=int,
+                            default=3,
+                            help='Stop contacting Netbox after this many failed runs in a row and use cached data instead, '
+                                 '0 disables the circuit breaker. (Default: 3)')
+        parser.add_argument('--breaker-cooldown',
+                            dest='breaker_cooldown',
+                            type=int,
+                            default=300,
+                            help='Seconds the circuit breaker stays open before Netbox is tried again. (Default: 300)')
+        parser.add_argument('--api',
+                            dest='api',
+                            choices=['rest', 'graphql'],
+                            default='rest',
+                            help='Fetch scripts and data sources with one GraphQL query instead of the REST API. '
+                                 'Falls back to REST if the query fails. (Default: rest)')
+        parser.add_argument('--max-concurrency',
+                            dest='max_concurrency',
+                            type=int,
+                            default=4,
+                            help='Maximal number of parallel requests to Netbox. (Default: 4)')
+        parser.add_argument('--page-size',
+                            dest='page_size',
+                            type=int,
+                            default=250,
+                            help='Number of objects requested per page from Netbox. (Default: 250)')
+        parser.add_argument('--cache-ttl',
+                            dest='cache_ttl',
+                            type=int,
+                            default=3600,
+                            help='Seconds the completed jobs are cached before the jobs of deleted objects are dropped '
+                                 'and the data source snapshot is fetched again in full. 0 disables the cache. (Default: 3600)')
+        parser.add_argument('--instance',
+                            dest='instances',
+                            nargs=3,
+                            metavar=('NAME', 'URL', 'TOKEN'),
+                            action='append',
+                            default=[],
+                            help='Additional Netbox to query in the same run. Can be given multiple times.')
+        parser.add_argument('--instance-mode',
+                            dest='instance_mode',
+                            choices=['prefix', 'piggyback'],
+                            default='prefix',
+                            help='Prefix the items of additional instances with their name or write their results '
+                                 'as piggyback data for a host named like the instance. (Default: prefix)')
+        parser.add_argument('--reconcile-interval',
+                            dest='reconcile_interval',
+                            type=int,
+                            default=0,
+                            metavar='SECONDS',
+                            help='Poll the jobs only every SECONDS and rely on the jobs pushed by the netbox receiver '
+                                 'in between. (Default: 0, poll on every run)')
+        parser.add_argument('--follow-schedule',
+                            dest='follow_schedule',
+                            action='store_true',
+                            help='Do not poll the jobs before the next scheduled run of a script or data source is due. '
+                                 'Results of jobs run by hand then show up with the next due run or the next full fetch.')
+        parser.add_argument('--script-module',
+                            dest='script_modules',
+                            type=int,
+                            action='append',
+                            default=[],
+                            metavar='ID',
+                            help='Only monitor the scripts of the script module with this ID. Can be given multiple times. '
+                                 'The scripts are then always listed with the REST API.')
+        parser.add_argument('--script-include',
+                            dest='script_include',
+                            metavar='REGEX',
+                            help='Only monitor the scripts whose name contains a match of REGEX.')
+        parser.add_argument('--script-exclude',
+                            dest='script_exclude',
+                            metavar='REGEX',
+                            help='Do not monitor the scripts whose name contains a match of REGEX.')
+        parser.add_argument('--data-source-include',
+                            dest='data_source_include',
+                            metavar='REGEX',
+                            help='Only monitor the data sources whose name contains a match of REGEX.')
+        parser.add_argument('--data-source-exclude',
+                            dest='data_source_exclude',
+                            metavar='REGEX',
+                            help='Do not monitor the data sources whose name contains a match of REGEX.')
+        parser.add_argument('--data-source-enabled-only',
+                            dest='data_source_enabled_only',
+                            action='store_true',
+                            help='Only monitor the enabled data sources.')
+        parser.add_argument('--shard',
+                            dest='shard',
+                            type=shard_argument,
+                            metavar='INDEX/COUNT',
+                            help='Only report the scripts, data sources and objects owned by shard INDEX of COUNT, '
+                                 'to spread a large Netbox over several agents. Changing COUNT only moves the items '
+                                 'of about one shard.')
+        parser.add_argument('--job-queue',
+                            dest='job_queue',
+                            action='store_true',
+                            help='Report the pending, scheduled and running jobs and the RQ workers of Netbox.')
+        parser.add_argument('--piggyback-scripts',
+                            dest='piggyback_scripts',
+                            metavar='HOST',
+                            help='Write the script results of all instances as piggyback data for HOST. '
+                                 'The items of additional instances are always prefixed with their name.')
+        parser.add_argument('--piggyback-data-sources',
+                            dest='piggyback_data_sources',
+                            metavar='HOST',
+                            help='Write the data source results of all instances as piggyback data for HOST. '
+                                 'The items of additional instances are always prefixed with their name.')
+        parser.add_argument('--piggyback-objects',
+                            dest='piggyback_objects',
+                            choices=PIGGYBACK_OBJECTS.keys(),
+                            action='append',
+                            default=[],
+                            help='Write the status of each object of this type as piggyback data for a host named like the object. '
+                                 'Can be given multiple times.')
+        parser.add_argument('--incremental',
+                            dest='incremental',
+                            action='store_true',
+                            help='Keep a snapshot of the data sources and only fetch the ones changed or synced since the last run. '
+                                 'The snapshot is refreshed in full after the cache TTL.')
         parser.add_argument('--ignore-cert',
                             dest='verify_cert',
                             action='store_false',
                             help='Do not verify the SSL cert from the REST andpoint.')
+        parser.add_argument('--collector-max-age',
+                            dest='collector_max_age',
+                            type=int,
+                            default=0,
+                            metavar='SECONDS',
+                            help='Write the output of a netbox collector running with the same arguments if it is '
+                                 'not older than SECONDS, instead of querying Netbox. (Default: 0, never)')
+
+        return parser
+
+    def main(self, args: Namespace):
+        if args.collector_max_age:
+            output = SpoolFile(args.url, 'spool' + shard_suffix(args)).read(args.collector_max_age)
+            if output is not None:
+                sys.stdout.write(output)
+                return
+            LOGGING.warning('No current output of the netbox collector, querying Netbox')
+
+        agents = [self.setup(args)]
+        for name, url, token in args.instances:
+            agents.append(AgentNetbox().setup(Namespace(**dict(vars(args), url=url, token=token)), name))
+        self.query_instances(agents)
+
+    def query_instances(self, agents):
+        '''Query the set up agents and write their sections.'''
+        # Create the sessions here, which also loads the HTTP stack. Lazy
+        # modules must not be loaded from several threads at once, and the
+        # cached properties are not locked, so the workers of an agent would
+        # each build a session and adapter of their own.
+        for agent in agents:
+            agent.client
+
+        # All instances are queried at the same time, their sections are
+        # written afterwards one instance after the other.
+        with ThreadPoolExecutor(max_workers=len(agents)) as executor:
+            futures = [executor.submit(agent.collect) for agent in agents]
+
+        failed = None
+        objects = set()
+        for agent, future in zip(agents, futures):
+            sections = []
+            for section in agent.sections:
+                # Object hosts are named like the objects, an object of the
+                # same name in a later instance would be ignored by the check.
+                if section.name == 'netbox_object':
+                    if section.host in objects:
+                        LOGGING.warning('Skipping %s of %s, an earlier instance has an object of the same name',
+                                        section.host, agent.args.url)
+                        continue
+                    objects.add(section.host)
+                sections.append(section)
+            # Sections collected before a failure are still written.
+            write_sections(sections)
+            if e := future.exception():
+                LOGGING.error('Failed to query %s: %s', agent.args.url, e)
+                failed = failed or e
+
+        hosts = {}
+        for agent in agents:
+            hosts.setdefault(agent.piggyback, []).append(agent)
+        for host, (agent, *others) in hosts.items():
+            with agent_common.ConditionalPiggybackSection(host):
+                agent.section_agent_stats(others)
 
-        return parser.parse_args(argv)
+        if failed:
+            raise failed
 
-    def main(self, args: Args):
+    def setup(self, args, name=None):
+        '''Configure the agent for a run against one Netbox, name is only given for additional instances.
+
+        Setting up an agent again starts a new run which keeps the HTTP
+        session and its open connections.
+        '''
         self.args = args
+        self.name = name
+        self.stats = AgentStats()
+        self.deadline = time.monotonic() + args.time_budget if args.time_budget else None
+        self.prefix = f'{name}/' if name and args.instance_mode == 'prefix' else ''
+        self.piggyback = name if name and args.instance_mode == 'piggyback' else None
+        # The results of all instances share an explicit piggyback host, so
+        # their items keep the instance name in every mode.
+        self.script_prefix = f'{name}/' if name and args.piggyback_scripts else self.prefix
+        self.data_source_prefix = f'{name}/' if name and args.piggyback_data_sources else self.prefix
+        self.sections = []
+        self.script_filter = NameFilter(args.script_include, args.script_exclude)
+        self.data_source_filter = NameFilter(args.data_source_include, args.data_source_exclude)
+        self.cache_suffix = shard_suffix(args)
+
+        for cached in ('graphql_objects', 'script_jobs', 'data_source_jobs', 'data_source_list'):
+            self.__dict__.pop(cached, None)
+        if 'http_cache' in self.__dict__:
+            self.http_cache.max_retries.deadline = self.deadline
+            self.http_cache.hits = self.http_cache.misses = 0
+            self.http_cache.offline = False
+        return self
+
+    def collect(self):
+        '''Query Netbox and collect the sections to write.'''
+        args = self.args
+        sections = self.sections
+
+        breaker = transport.CircuitBreaker(args.url, args.breaker_threshold, args.breaker_cooldown)
+        if breaker.is_open():
+            LOGGING.warning('Circuit breaker of %s is open, using cached data only', args.url)
+            self.http_cache.offline = True
+
+        try:
+            with ThreadPoolExecutor(max_workers=args.max_concurrency) as executor:
+                self.executor = executor
 
-        self.section_scripts()
-        self.section_data_sources()
+                # Start the independent fetches right away, the sections are then
+                # collected one after the other in a fixed order while the scripts
+                # are streamed page by page.
+                if args.api == 'graphql':
+                    self.graphql_objects
+                self.script_jobs
+                if args.incremental:
+                    # The incremental data source fetch waits for the jobs,
+                    # so they have to be queued first.
+                    self.data_source_jobs
+                self.data_source_list
+
+                sections.append(self.section_scripts())
+                sections.append(self.section_data_sources())
+                if args.job_queue:
+                    sections.extend(self.section_job_queue())
+                for objects in args.piggyback_objects:
+                    sections.extend(self.section_objects(*PIGGYBACK_OBJECTS[objects]))
+        finally:
+            if not self.http_cache.offline:
+                # Only an overloaded or unreachable Netbox trips the breaker, an
+                # endpoint refusing the token fails however long the agent waits.
+                breaker.record(failed=self.stats.overloads > 0)
+            self.http_cache.prune(24 * 3600)
 
     def section_scripts(self):
-        with SectionWriter('netbox_script', separator=',') as writer:
-            for script in self.scripts():
-                try:
-                    detail = self.get_job_detail(script)
-                    if not detail:
-                        writer.append(script['name'])
-                        continue
+        return self.cached_section('netbox_script', self.script_records(), as_json=True,
+                                   host=self.args.piggyback_scripts or self.piggyback)
 
-                    writer.append(','.join([
-                        script['name'],
-                        '',
-                        detail['status']['value'],
-                        detail['completed'],
-                    ]))
-
-                    for test_name, test_result in detail['data'].get('tests', {}).items():
-                        writer.append(','.join([
-                            script['name'],
-                            test_name,
-                            detail['status']['value'],
-                            detail['completed'],
-                            str(test_result['info']),
-                            str(test_result['success']),
-                            str(test_result['warning']),
-                            str(test_result['failure']),
-                        ]))
-                except Exception:
-                    pass
+    def script_records(self):
+        '''Yield one record per script with the result of its last job and the counters of each test.'''
+        for script in self.scripts():
+            if not self.script_filter(script['name']) or not self.owns(self.script_prefix + script['name']):
+                continue
+            try:
+                detail = self.get_job_detail(script)
+                record = dict(name=self.script_prefix + script['name'])
+                if detail:
+                    record.update(
+                        status=detail['status']['value'],
+                        completed=detail['completed'],
+                        tests={
+                            test_name: [test_result['info'], test_result['success'], test_result['warning'], test_result['failure']]
+                            for test_name, test_result in detail['data'].get('tests', {}).items()
+                        },
+                    )
+                    if detail.get('started'):
+                        record.update(job_durations(detail))
+                yield record
+            except requests.RequestException:
+                raise
+            except Exception as e:
+                LOGGING.warning('Failed to get the result of script %s: %s', script['name'], e)
+                self.stats.error()
 
-    def scripts(self):
-        url = '{}/extras/scripts/'.format(self.args.url)
+    def cached_section(self, name, records, **kwargs):
+        '''Collect a section and keep its records as the last good data.
+
+        If Netbox can not be queried, the section is made of the last good
+        records instead and carries the time they were fetched.
+        '''
+        cache = SectionCache(self.args.url, name + self.cache_suffix)
+        cached = None
+        try:
+            records = list(records)
+        except requests.RequestException as e:
+            records, cached = cache.load()
+            if records is None:
+                raise
+            LOGGING.warning('Failed to query %s, using the %s section fetched at %s: %s',
+                            self.args.url, name, datetime.fromtimestamp(cached).isoformat(), e)
+            self.stats.error()
+        else:
+            cache.save(records)
+        return Section(name, records, cached=cached, **kwargs)
+
+    def paginate(self, path, fields, **params):
+        '''Yield the objects of a Netbox list endpoint one by one, following the next links.
+
+        Only the given fields are requested and kept of each object.
+        '''
+        url = '{}/{}'.format(self.args.url, path)
+        params['fields'] = ','.join(fields)
+        params['limit'] = self.args.page_size
         while url:
-            response = self.client.get('{}/extras/scripts/'.format(self.args.url), timeout=self.args.timeout, verify=self.args.verify_cert)
-            page = response.json()
-            yield from page['results']
-            url = page['next']
-
-    def get_job_detail(self, job):
-        params = dict(
-            object_id=job['id'],
-            completed__after='1970-01-01',
-            limit=1,
+            # Decode the page while it arrives, so large job data is
+            # dropped item by item instead of being held as a whole.
+            page = PageStream(self.get(url, params))
+            for result in page:
+                yield {field: result[field] for field in fields if field in result}
+            # The next link already carries all query parameters.
+            url = page.meta['next']
+            params = None
+
+    @cached_property
+    def graphql_objects(self):
+        return self.executor.submit(self.get_graphql_objects)
+
+    def get_graphql_objects(self):
+        '''Fetch the scripts and data sources with one GraphQL query, None if that fails.'''
+        url = '{}/graphql/'.format(self.args.url.rstrip('/').removesuffix('/api'))
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.client.post(url, json=dict(query=GRAPHQL_QUERY), timeout=self.timeout, verify=self.args.verify_cert)
+            response.raise_for_status()
+            result = response.json()
+            if result.get('errors'):
+                raise ValueError(result['errors'])
+            self.stats.record(self.endpoint(url), time.perf_counter() - started, len(response.content))
+            return result['data']
+        except (requests.RequestException, ValueError, KeyError) as e:
+            LOGGING.warning('GraphQL query failed, falling back to the REST API: %s', e)
+            received = len(response.content) if response is not None else 0
+            self.stats.record(self.endpoint(url), time.perf_counter() - started, received, error=True,
+                              overload=transport.is_overload(e))
+            return None
+
+    def get(self, url, params=None):
+        '''GET url and yield its body in chunks, recording time, size and errors per endpoint.
+
+        Only the time spent waiting for Netbox is recorded, not the time the
+        caller takes to process the chunks.
+        '''
+        duration = received = 0
+        error = overload = False
+        try:
+            started = time.perf_counter()
+            with self.client.get(url, timeout=self.timeout, params=params, verify=self.args.verify_cert, stream=True) as response:
+                duration = time.perf_counter() - started
+                response.raise_for_status()
+                chunks = response.iter_content(CHUNK_SIZE)
+                while True:
+                    started = time.perf_counter()
+                    chunk = next(chunks, None)
+                    duration += time.perf_counter() - started
+                    if chunk is None:
+                        break
+                    if self.deadline is not None and time.monotonic() > self.deadline:
+                        raise transport.TimeBudgetExceeded(f'The time budget ran out while reading {url}')
+                    received += len(chunk)
+                    yield chunk
+        except Exception as e:
+            error = True
+            overload = transport.is_overload(e)
+            raise
+        finally:
+            self.stats.record(self.endpoint(url), duration, received, error=error, overload=overload)
+
+    @property
+    def timeout(self):
+        '''Connect and read timeout for the next request, capped to the remaining time budget.'''
+        read = self.args.timeout
+        if self.deadline is not None:
+            remaining = self.deadline - time.monotonic()
+            if remaining <= 0:
+                raise transport.TimeBudgetExceeded('The time budget of the agent run is used up')
+            read = min(read, remaining)
+        return (min(self.args.connect_timeout, read), read)
+
+    def endpoint(self, url):
+        '''Name of the endpoint of url relative to the API URL, like core/jobs/.'''
+        base = urlsplit(self.args.url).path.rstrip('/')
+        return urlsplit(url).path.removeprefix(base).lstrip('/')
+
+    def owns(self, name):
+        '''Whether the item name is reported by the shard of this agent.'''
+        return self.args.shard is None or shard_of(name, self.args.shard[1]) == self.args.shard[0]
+
+    def scripts(self):
+        if self.args.api == 'graphql' and not self.args.script_modules and (data := self.graphql_objects.result()):
+            return (dict(id=int(script['id']), name=script['name']) for script in data['script_list'])
+        return self.paginate('extras/scripts/', SCRIPT_FIELDS, **self.script_params())
+
+    def script_params(self):
+        '''Netbox filters for the monitored scripts, the names are matched locally again.'''
+        params = {}
+        if self.args.script_modules:
+            params['module_id'] = self.args.script_modules
+        if portable_regex(self.args.script_include):
+            params['name__regex'] = self.args.script_include
+        return params
+
+    def get_job_detail(self, script):
+        return self.script_jobs.result().get(script['id'], {})
+
+    @cached_property
+    def script_jobs(self):
+        # The test results of a script are in the data of its job.
+        return self.executor.submit(self.get_latest_jobs, 'extras.script', 'extras/scripts/', ('data',))
+
+    def get_latest_jobs(self, object_type, objects_path, detail_fields=()):
+        '''Index the most recent completed job of each object of object_type by its object_id.
+
+        Jobs from previous runs and from webhook events are taken from the job
+        store, so only jobs completed since the last poll are fetched from
+        Netbox. Within the reconcile interval, or with --follow-schedule until
+        the next scheduled run is due, Netbox is not polled at all.
+
+        Without a watermark the whole job history is swept, newest first, until
+        every object listed at objects_path has a job. An expired store keeps
+        its watermark and only loses the jobs of objects no longer listed. The
+        detail_fields, like the large data of script jobs, are only fetched for
+        the latest jobs.
+        '''
+        store = JobStore(self.args.url, object_type, self.args.cache_ttl)
+        cached = store.load()
+        if cached and not store.expired and time.time() - store.polled < self.args.reconcile_interval:
+            return cached
+        if cached and not store.expired and self.args.follow_schedule and time.time() < (next_run := next_scheduled_run(cached)):
+            LOGGING.debug('No scheduled %s job due before %s', object_type, datetime.fromtimestamp(next_run))
+            return cached
+
+        first_sweep = not store.watermark
+        watermark = store.watermark or '1970-01-01'
+        latest = {}
+        jobs = self.paginate(
+            'core/jobs/',
+            JOB_FIELDS,
+            object_type=object_type,
+            completed__after=watermark,
             ordering='-completed',
         )
-        response = self.client.get(f"{self.args.url}/core/jobs/", timeout=self.args.timeout, params=params, verify=self.args.verify_cert)
-        if response.json()['results']:
-            return response.json()['results'][0]
-        return {}
+        try:
+            # All objects are listed, not only the monitored ones, as agents
+            # with other filters or shards share the job store.
+            objects = None
+            if first_sweep or store.expired:
+                objects = {obj['id'] for obj in self.paginate(objects_path, ('id',))}
+            unseen = set(objects) if first_sweep else None
+            while unseen is None or unseen:
+                job = next(jobs, None)
+                if job is None:
+                    break
+                latest.setdefault(job['object_id'], job)
+                if unseen is not None:
+                    unseen.discard(job['object_id'])
+            # completed__after includes the watermark, so the newest stored
+            # job comes back on every poll and is not fetched again.
+            latest = {object_id: job for object_id, job in latest.items() if cached.get(object_id, {}).get('id') != job['id']}
+            if detail_fields:
+                ids = [job['id'] for job in latest.values()]
+                for chunk in range(0, len(ids), 100):
+                    details = {job['id']: job for job in self.paginate('core/jobs/', ('id', *detail_fields), id=ids[chunk:chunk + 100])}
+                    for job in latest.values():
+                        job.update(details.get(job['id'], {}))
+        except requests.RequestException as e:
+            if not cached:
+                raise
+            LOGGING.warning('Failed to fetch the %s jobs, using cached jobs: %s', object_type, e)
+            return cached
+
+        if latest:
+            watermark = max((job['completed'] for job in latest.values()), key=datetime.fromisoformat)
+        return store.merge({object_id: slim_job(job) for object_id, job in latest.items()}, watermark=watermark,
+                           objects=objects if store.expired else None)
 
     def section_data_sources(self):
-        with SectionWriter('netbox_data_source') as writer:
-            for data_source in self.get_data_sources():
+        return self.cached_section('netbox_data_source', self.data_source_records(), as_json=True,
+                                   host=self.args.piggyback_data_sources or self.piggyback)
+
+    def data_source_records(self):
+        for data_source in self.data_source_list.result():
+            if not self.data_source_filter(data_source['name']) or not self.owns(self.data_source_prefix + data_source['name']):
+                continue
+            if self.args.data_source_enabled_only and not data_source['enabled']:
+                continue
+            try:
                 if 'last_synced' not in data_source:
                     detail = self.get_data_sources_detail(data_source)
                     data_source['last_synced'] = detail['completed']
-                writer.append_json(dict(
-                    name=data_source['name'],
+                yield dict(
+                    name=self.data_source_prefix + data_source['name'],
                     description=data_source['description'],
                     enabled=data_source['enabled'],
                     status=data_source['status'],
                     last_synced=data_source['last_synced'],
                     file_count=data_source['file_count'],
-                ))
+                )
+            except requests.RequestException:
+                raise
+            except Exception as e:
+                LOGGING.warning('Failed to get the last sync of data source %s: %s', data_source['name'], e)
+                self.stats.error()
+
+    @cached_property
+    def data_source_list(self):
+        return self.executor.submit(self.get_data_sources)
 
     def get_data_sources(self):
-        response = self.client.get('{}/core/data-sources/'.format(self.args.url), timeout=self.args.timeout, verify=self.args.verify_cert)
-        return response.json()['results']
+        if self.args.api == 'graphql' and (data := self.graphql_objects.result()):
+            return [
+                dict(
+                    id=int(data_source['id']),
+                    name=data_source['name'],
+                    description=data_source['description'],
+                    enabled=data_source['enabled'],
+                    status=graphql_choice(data_source['status']),
+                    last_synced=data_source['last_synced'],
+                    file_count=len(data_source['datafiles']),
+                )
+                for data_source in data['data_source_list']
+            ]
+        if self.args.incremental:
+            return sorted(self.get_data_sources_incremental().values(), key=lambda data_source: data_source['name'])
+        return list(self.paginate('core/data-sources/', DATA_SOURCE_FIELDS, **self.data_source_params()))
 
-    def get_data_sources_detail(self, data_sorce):
-        url = '{}/core/jobs/?object_id={}&completed__after=1970-01-01&ordering=-completed'.format(self.args.url, data_sorce['id'])
-        while url:
-            response = self.client.get(url, timeout=self.args.timeout, verify=self.args.verify_cert)
-            page = response.json()
-            for result in page['results']:
-                if result['object_type'] == "core.datasource":
-                    return result
-            url = page['next']
-        return {}
+    def data_source_params(self):
+        '''Netbox filters for the monitored data sources, the data sources are matched locally again.'''
+        params = {}
+        if self.args.data_source_enabled_only:
+            params['enabled'] = 'true'
+        if portable_regex(self.args.data_source_include):
+            params['name__regex'] = self.args.data_source_include
+        return params
+
+    def get_data_sources_incremental(self):
+        '''Update the data source snapshot with the data sources changed or synced since the last run.
+
+        A sync does not touch last_updated, so synced data sources are found
+        by a newer job than the one seen when they were last fetched.
+        '''
+        params = self.data_source_params()
+        # A snapshot starts with the data sources matching its filters. Changes
+        # are fetched unfiltered, so a data source changed to no longer match
+        # is updated and then dropped by the local filters.
+        name = f'data_sources_{cache_key(repr(sorted(params.items())))}' if params else 'data_sources'
+        cache = ObjectCache(self.args.url, name, self.args.cache_ttl)
+        snapshot = cache.load()
+        jobs = self.data_source_jobs.result()
+
+        if not snapshot:
+            changed = self.paginate('core/data-sources/', DATA_SOURCE_FIELDS, **params)
+        else:
+            last_updated = max((data_source['last_updated'] for data_source in snapshot.values()), key=datetime.fromisoformat)
+            changed = self.paginate('core/data-sources/', DATA_SOURCE_FIELDS, last_updated__gte=last_updated)
+            synced = [
+                data_source_id
+                for data_source_id, data_source in snapshot.items()
+                if jobs.get(data_source_id, {}).get('id') != data_source['job']
+            ]
+            for chunk in range(0, len(synced), 100):
+                changed = itertools.chain(changed, self.paginate('core/data-sources/', DATA_SOURCE_FIELDS, id=synced[chunk:chunk + 100]))
+
+        try:
+            for data_source in list(changed):
+                data_source['job'] = jobs.get(data_source['id'], {}).get('id')
+                snapshot[data_source['id']] = data_source
+        except requests.RequestException as e:
+            if not snapshot:
+                raise
+            LOGGING.warning('Failed to fetch the changed data sources, using the snapshot: %s', e)
+            return snapshot
+
+        cache.save(snapshot)
+        return snapshot
+
+    def get_data_sources_detail(self, data_source):
+        return self.data_source_jobs.result().get(data_source['id'], {})
+
+    @cached_property
+    def data_source_jobs(self):
+        return self.executor.submit(self.get_latest_jobs, 'core.datasource', 'core/data-sources/')
+
+    def section_job_queue(self):
+        '''Return the backlog of the job queue as section, none if Netbox can not be queried.
+
+        Queue figures are only meaningful when current, so there is no cached
+        section. Every job status is counted with a request for one job only.
+        '''
+        counts = {
+            status: self.executor.submit(self.first, 'core/jobs/', ('id', 'created'), status=status, ordering='created')
+            for status in QUEUED_JOB_STATUS
+        }
+        netbox_status = self.executor.submit(self.get_json, 'status/')
+        try:
+            record = dict(name=urlsplit(self.args.url).netloc)
+            for status, future in counts.items():
+                record[status], job = future.result()
+                if status == 'pending':
+                    record['oldest_pending'] = job['created'] if job else None
+            record['workers'] = netbox_status.result()['rq-workers-running']
+        except (requests.RequestException, ValueError, KeyError) as e:
+            LOGGING.warning('Failed to get the job queue of %s: %s', self.args.url, e)
+            self.stats.error()
+            return []
+        return [Section('netbox_job_queue', [record], as_json=True, host=self.piggyback)]
+
+    def first(self, path, fields, **params):
+        '''Return the number of objects of a Netbox list endpoint and the first of them, or None.'''
+        params['fields'] = ','.join(fields)
+        params['limit'] = 1
+        page = PageStream(self.get('{}/{}'.format(self.args.url, path), params))
+        results = list(page)
+        return page.meta['count'], results[0] if results else None
+
+    def get_json(self, path):
+        return json.loads(b''.join(self.get('{}/{}'.format(self.args.url, path))))
+
+    def section_objects(self, object_type, path):
+        '''Yield the status of every named object of path as section for a piggyback host of the same name.'''
+        for obj in self.paginate(path, OBJECT_FIELDS):
+            if not obj.get('name') or not self.owns(obj['name']):
+                continue
+            yield Section('netbox_object', [dict(
+                type=object_type,
+                id=obj['id'],
+                status=obj['status'],
+                site=(obj.get('site') or {}).get('name'),
+            )], as_json=True, host=obj['name'])
+
+    def section_agent_stats(self, others=()):
+        '''Write the statistics of this and the other agents, whose endpoints are prefixed with their name.'''
+        summary = self.stats.summary()
+        agents = [self, *others]
+        for agent in others:
+            other = agent.stats.summary()
+            summary['errors'] += other['errors']
+            summary['endpoints'].update({agent.prefix + endpoint: stats for endpoint, stats in other['endpoints'].items()})
+
+        with agent_common.SectionWriter('netbox_agent_stats') as writer:
+            writer.append_json(dict(
+                summary,
+                circuit_breaker='open' if any(agent.http_cache.offline for agent in agents) else 'closed',
+                cache=dict(
+                    hits=sum(agent.http_cache.hits for agent in agents),
+                    misses=sum(agent.http_cache.misses for agent in agents),
+                ),
+            ))
+
+    @cached_property
+    def http_cache(self):
+        retry = transport.BudgetRetry(
+            total=self.args.retries,
+            backoff_factor=0.5,
+            backoff_max=30,
+            backoff_jitter=0.5,
+            status_forcelist=transport.RETRY_STATUS,
+            allowed_methods=['GET', 'POST'],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            on_retry=lambda url: self.stats.retry(self.endpoint(url)),
+            deadline=self.deadline,
+        )
+        return transport.CachingAdapter(self.args.url, pool_maxsize=self.args.max_concurrency, max_retries=retry)
 
     @cached_property
     def client(self):
+        if not self.args.verify_cert:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         c = requests.Session()
+        c.mount('http://', self.http_cache)
+        c.mount('https://', self.http_cache)
         c.headers.update({
             'Accept': 'application/json',
             'Authorization': 'Token {}'.format(self.args.token)
@@ -161,5 +861,90 @@ class AgentNetbox:
         return c
 
 
+def write_sections(sections):
+    for section in sections:
+        with agent_common.ConditionalPiggybackSection(section.host):
+            with agent_common.SectionWriter(section.name, separator=section.separator) as writer:
+                append = writer.append_json if section.as_json else writer.append
+                if section.cached is not None:
+                    append(dict(cached=section.cached) if section.as_json else f'@cached,{section.cached}')
+                for record in section.records:
+                    append(record)
+
+
+def slim_job(job):
+    '''Reduce a Netbox job to the fields the sections are built from.'''
+    return dict(
+        id=job['id'],
+        status=job['status'],
+        completed=job['completed'],
+        created=job.get('created'),
+        scheduled=job.get('scheduled'),
+        interval=job.get('interval'),
+        started=job.get('started'),
+        data=dict(tests=(job.get('data') or {}).get('tests', {})),
+    )
+
+
+def shard_argument(value):
+    '''Parse INDEX/COUNT of the --shard argument.'''
+    try:
+        index, count = map(int, value.split('/'))
+    except ValueError:
+        raise ArgumentTypeError(f'expected INDEX/COUNT, got {value!r}')
+    if not 1 <= index <= count:
+        raise ArgumentTypeError(f'INDEX must be between 1 and COUNT, got {value!r}')
+    return index, count
+
+
+def shard_of(name, count):
+    '''Shard from 1 to count owning name.
+
+    Every shard draws a hash of itself and the name and the highest one wins,
+    so a new shard only takes over the names it wins and removing a shard
+    only moves its own names.
+    '''
+    return max(range(1, count + 1), key=lambda shard: hashlib.sha256(f'{shard}/{name}'.encode()).digest())
+
+
+def shard_suffix(args):
+    '''Suffix of the cache files of a shard, shards of the same Netbox must not share their sections.'''
+    return '_shard{}of{}'.format(*args.shard) if args.shard else ''
+
+
+def next_scheduled_run(jobs, now=None):
+    '''Time the earliest next run of the recurring jobs is due, 0 if there is none.
+
+    Netbox schedules the next run of a recurring job interval minutes after
+    the time the job was scheduled for. A run overdue by more than another
+    interval and SCHEDULE_GRACE is taken as no longer scheduled, like after
+    the schedule was deleted or the job was not enqueued again.
+    '''
+    now = time.time() if now is None else now
+    due = []
+    for job in jobs.values():
+        if not job.get('scheduled') or not job.get('interval'):
+            continue
+        next_run = datetime.fromisoformat(job['scheduled']).timestamp() + job['interval'] * 60
+        if next_run + job['interval'] * 60 + SCHEDULE_GRACE >= now:
+            due.append(next_run)
+    return min(due, default=0)
+
+
+def job_durations(job):
+    '''Seconds a started job ran and waited for a worker since it was created or scheduled for.'''
+    started = datetime.fromisoformat(job['started'])
+    durations = dict(runtime=round((datetime.fromisoformat(job['completed']) - started).total_seconds(), 3))
+    if queued := job.get('scheduled') or job.get('created'):
+        durations['queue_wait'] = round(max(0.0, (started - datetime.fromisoformat(queued)).total_seconds()), 3)
+    return durations
+
+
+def graphql_choice(value):
+    '''Turn a GraphQL choice enum into the value/label dict the REST API returns.'''
+    value = str(value).lower()
+    return dict(value=value, label=value.capitalize())
+
+
 if __name__ == '__main__':
     AgentNetbox().run()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from cmk.utils.paths import tmp_dir
+
+CACHE_DIR = tmp_dir / 'agents' / 'agent_netbox'
+
+
+def cache_key(url):
+    return hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+def write_atomic(path, content):
+    '''Replace path with content without readers ever seeing a partial file.'''
+    path.parent.mkdir(parents=True, exist_ok=True)
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    with tempfile.NamedTemporaryFile(mode, dir=path.parent, prefix=f'.{path.name}.', delete=False) as tmp:
+        tmp.write(content)
+    os.replace(tmp.name, path)
+
+
+class ObjectCache:
+    '''Netbox objects by id, kept between agent runs in a file per Netbox URL and name.
+
+    The objects are dropped once the cache is older than ttl seconds, so the
+    next run fetches everything again and removed objects disappear.
+    '''
+
+    def __init__(self, url, name, ttl):
+        self.path = CACHE_DIR / f'{cache_key(url)}_{name}.json'
+        self.ttl = ttl
+        self.created = None
+
+    def load(self):
+        '''Return the cached objects by id or an empty dict if there is no valid cache.'''
+        self.created = None
+        if not self.ttl:
+            return {}
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if time.time() - data['created'] > self.ttl:
+            return {}
+        self.created = data['created']
+        return {int(object_id): obj for object_id, obj in data['objects'].items()}
+
+    def save(self, objects):
+        if not self.ttl:
+            return
+        write_atomic(self.path, json.dumps(dict(
+            created=self.created or time.time(),
+            objects=objects,
+        )))
+
+
+class JobStore:
+    '''Latest completed job per object, kept current by the polls of the agent and by webhook events.
+
+    Updates are merged under a file lock and keep the job that completed
+    last, so polls and events may arrive in any order. The watermark is the newest
+    completion seen by a poll. The next poll fetches only the jobs completed
+    since then, which also finds the jobs whose events were lost.
+
+    A store older than ttl seconds keeps its jobs and watermark but is
+    expired. The next poll reconciles it with the existing objects, which
+    drops the jobs of deleted objects and starts the ttl again.
+    '''
+
+    def __init__(self, url, object_type, ttl):
+        self.path = CACHE_DIR / f'{cache_key(url)}_jobs_{object_type}.json'
+        self.ttl = ttl
+        self.created = None
+        self.polled = 0
+        self.watermark = None
+        self.expired = False
+
+    def _read(self):
+        try:
+            return json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def load(self):
+        '''Return the stored jobs by object id or an empty dict if there is no store.'''
+        self.created, self.polled, self.watermark, self.expired = None, 0, None, False
+        data = self._read() if self.ttl else None
+        if data is None:
+            return {}
+        jobs = {int(object_id): job for object_id, job in data['objects'].items()}
+        self.created = data['created']
+        self.expired = time.time() - data['created'] > self.ttl
+        self.polled = data.get('polled', data['created'])
+        self.watermark = data.get('watermark') or max(
+            (job['completed'] for job in jobs.values()), key=datetime.fromisoformat, default=None)
+        return jobs
+
+    def merge(self, jobs, watermark=None, objects=None):
+        '''Merge jobs into the store and return all stored jobs.
+
+        Polls pass their watermark. A poll after load() found no store starts
+        a new one, events are only merged into an existing store. A poll
+        reconciling the store passes the ids of all existing objects, the jobs
+        of other objects are dropped.
+        '''
+        if not self.ttl:
+            return jobs
+        with self._lock():
+            data = self._read()
+            if watermark is not None:
+                created = self.created or time.time()
+            elif data is None:
+                return {}
+            else:
+                created = data['created']
+
+            stored = {}
+            if data is not None and data['created'] == created:
+                stored = {int(object_id): job for object_id, job in data['objects'].items()}
+            if objects is not None:
+                stored = {object_id: job for object_id, job in stored.items() if object_id in objects}
+                created = time.time()
+            for object_id, job in jobs.items():
+                if object_id not in stored or completion(job) >= completion(stored[object_id]):
+                    stored[object_id] = job
+
+            write_atomic(self.path, json.dumps(dict(
+                created=created,
+                polled=time.time() if watermark is not None else data.get('polled', created),
+                watermark=watermark or (data or {}).get('watermark'),
+                objects=stored,
+            )))
+        return stored
+
+    @contextmanager
+    def _lock(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix('.lock'), 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+
+def completion(job):
+    '''Sort key of a job by its completion, jobs completed at the same time by id.
+
+    A job run by hand while a scheduled job waits gets the higher id but may
+    complete first, so the id alone does not tell the latest result.
+    '''
+    return datetime.fromisoformat(job['completed']), job['id']
+
+
+class SectionCache:
+    '''Payload of the last complete agent section per Netbox URL, kept to answer while Netbox is unavailable.'''
+
+    def __init__(self, url, name):
+        self.path = CACHE_DIR / f'{cache_key(url)}_section_{name}.json'
+
+    def load(self):
+        '''Return the stored records and the time they were fetched, or (None, None).'''
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return None, None
+        return data['records'], data['created']
+
+    def save(self, records):
+        write_atomic(self.path, json.dumps(dict(
+            created=time.time(),
+            records=records,
+        )))
+
+
+class SpoolFile:
+    '''Latest complete agent output of the netbox collector for one Netbox URL and name.'''
+
+    def __init__(self, url, name='spool'):
+        self.path = CACHE_DIR / f'{cache_key(url)}_{name}.txt'
+
+    def read(self, max_age):
+        '''Return the output if it was written within max_age seconds, else None.'''
+        try:
+            if time.time() - self.path.stat().st_mtime > max_age:
+                return None
+            return self.path.read_text()
+        except OSError:
+            return None
+
+    def write(self, output):
+        write_atomic(self.path, output)
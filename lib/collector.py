@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+'''Resident collector for the Netbox special agent.
+
+Run it inside the site with the arguments of the special agent rule:
+
+    python3 -m cmk_addons.plugins.netbox.lib.collector --interval 60 -U https://netbox.example.com/api -T TOKEN
+
+and set the special agent to use its output with --collector-max-age.
+'''
+
+import io
+import logging
+import sys
+import time
+from argparse import Namespace
+from contextlib import redirect_stdout
+
+from cmk_addons.plugins.netbox.lib.agent import AgentNetbox, shard_suffix
+from cmk_addons.plugins.netbox.lib.cache import SpoolFile
+
+LOGGING = logging.getLogger('agent_netbox')
+
+
+class CollectorNetbox(AgentNetbox):
+    '''Netbox collector polling Netbox and keeping the latest agent output in a spool file'''
+
+    def argument_parser(self):
+        parser = super().argument_parser()
+        parser.add_argument('--interval',
+                            dest='interval',
+                            type=int,
+                            default=60,
+                            help='Seconds between the start of two polls. (Default: 60)')
+        parser.add_argument('--once',
+                            dest='once',
+                            action='store_true',
+                            help='Poll Netbox once and exit.')
+        return parser
+
+    def main(self, args):
+        spool = SpoolFile(args.url, 'spool' + shard_suffix(args))
+        agents = [self] + [AgentNetbox() for _instance in args.instances]
+        instances = [(args, None)] + [
+            (Namespace(**dict(vars(args), url=url, token=token)), name)
+            for name, url, token in args.instances
+        ]
+
+        while True:
+            started = time.monotonic()
+            for agent, (instance_args, name) in zip(agents, instances):
+                agent.setup(instance_args, name)
+
+            output = io.StringIO()
+            try:
+                with redirect_stdout(output):
+                    self.query_instances(agents)
+            except Exception as e:
+                # The spool of the last good poll is kept and ages out, so
+                # the agent queries Netbox itself once it is too old.
+                LOGGING.error('Poll failed: %s', e)
+            else:
+                spool.write(output.getvalue())
+
+            if args.once:
+                return
+            time.sleep(max(0, args.interval - (time.monotonic() - started)))
+
+
+if __name__ == '__main__':
+    sys.exit(CollectorNetbox().run())
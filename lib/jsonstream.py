@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import codecs
+import json
+
+DECODER = json.JSONDecoder()
+WHITESPACE = ' \t\n\r'
+
+
+class PageStream:
+    '''Incrementally decode a Netbox list page from an iterable of byte chunks.
+
+    Iterating yields the items of the results array one by one as soon as
+    they are complete, so only one item is held in memory at a time. All
+    other keys of the page, like next and count, are collected in meta.
+    '''
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.meta = {}
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+        else:
+            while True:
+                key = self._value()
+                self._expect(':')
+                if key == 'results':
+                    yield from self._array()
+                else:
+                    self.meta[key] = self._value()
+                if self._expect(',}') == '}':
+                    break
+        self._end()
+
+    def _end(self):
+        '''Read the stream to its end, only whitespace may follow the page.'''
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                raise ValueError(f'Unexpected data after the page: {self.buffer[self.pos]!r}')
+            if not self._fill(1):
+                return
+
+    def _array(self):
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                return
+
+    def _fill(self, size):
+        '''Buffer at least size characters after pos, False if the stream ends before.'''
+        while len(self.buffer) - self.pos < size:
+            if self.eof:
+                return False
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.eof = True
+                data = self.decoder.decode(b'', final=True)
+            else:
+                data = self.decoder.decode(chunk)
+            self.buffer = self.buffer[self.pos:] + data
+            self.pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(1):
+                raise ValueError('Unexpected end of JSON data')
+
+    def _expect(self, chars):
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(f'Expected one of {chars!r} but got {char!r}')
+        self.pos += 1
+        return char
+
+    def _value(self):
+        self._peek()
+        size = len(self.buffer) - self.pos
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buffer, self.pos)
+                # A value ending with the buffer might be a cut off number.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the buffer geometrically to keep re-decoding large values cheap.
+            size *= 2
+            self._fill(size)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+'''Receiver for Netbox webhooks of finished jobs.
+
+Run it inside the site with the URL of the special agent rule:
+
+    python3 -m cmk_addons.plugins.netbox.lib.receiver --port 8085 --secret SECRET -U https://netbox.example.com/api
+
+and add a webhook to http://<site host>:8085/ with the same secret in
+Netbox, used by an event rule on the job end of scripts and data sources.
+The jobs are written to the job store of the special agent, which then
+only needs to poll Netbox every --reconcile-interval.
+'''
+
+import hashlib
+import hmac
+import json
+import logging
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cmk.special_agents.v0_unstable.agent_common import special_agent_main
+from cmk.special_agents.v0_unstable.argument_parsing import Args, create_default_argument_parser
+
+from cmk_addons.plugins.netbox.lib.agent import slim_job
+from cmk_addons.plugins.netbox.lib.cache import JobStore
+
+LOGGING = logging.getLogger('agent_netbox')
+
+JOB_OBJECT_TYPES = ('extras.script', 'core.datasource')
+FINISHED = ('completed', 'errored', 'failed')
+# Largest event accepted. The data of a script job with its log is seldom
+# more than a few hundred KiB.
+MAX_BODY = 8 * 1024 * 1024
+
+
+class ReceiverNetbox:
+    '''Netbox webhook receiver updating the job store of the special agent'''
+
+    def run(self):
+        special_agent_main(self.parse_arguments, self.main)
+
+    def parse_arguments(self, argv):
+        parser = create_default_argument_parser(description=self.__doc__)
+
+        parser.add_argument('-U', '--url',
+                            dest='url',
+                            required=True,
+                            help='Rest API URL of the Netbox as given to the special agent.')
+        parser.add_argument('--listen',
+                            dest='listen',
+                            default='',
+                            help='Address to listen on. (Default: all addresses)')
+        parser.add_argument('--port',
+                            dest='port',
+                            type=int,
+                            default=8085,
+                            help='Port to listen on. (Default: 8085)')
+        parser.add_argument('--secret',
+                            dest='secret',
+                            required=True,
+                            help='Secret of the Netbox webhook, requests without a matching signature are rejected.')
+        parser.add_argument('--cache-ttl',
+                            dest='cache_ttl',
+                            type=int,
+                            default=3600,
+                            help='Cache TTL of the special agent. (Default: 3600)')
+
+        return parser.parse_args(argv)
+
+    def main(self, args: Args):
+        server = ThreadingHTTPServer((args.listen, args.port), WebhookHandler)
+        server.args = args
+        LOGGING.info('Listening on %s:%d', args.listen or '*', args.port)
+        server.serve_forever()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        LOGGING.debug(format, *args)
+
+    def do_POST(self):
+        args = self.server.args
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_BODY:
+            # The body is not read, so the connection can not be reused.
+            LOGGING.warning('Rejected a request from %s with a body of %s bytes', self.client_address[0], self.headers.get('Content-Length'))
+            self.close_connection = True
+            return self.reply(413 if length > MAX_BODY else 400)
+        body = self.rfile.read(length)
+
+        # Jobs decide the state of the script services, so only signed
+        # events of Netbox are accepted.
+        signature = hmac.new(args.secret.encode(), body, hashlib.sha512).hexdigest()
+        if not hmac.compare_digest(signature, self.headers.get('X-Hook-Signature', '')):
+            LOGGING.warning('Rejected a request from %s without a valid signature', self.client_address[0])
+            return self.reply(403)
+
+        try:
+            job = job_of_event(json.loads(body))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            LOGGING.warning('Ignoring malformed event: %s', e)
+            return self.reply(400)
+
+        if job is not None:
+            store = JobStore(args.url, job['object_type'], args.cache_ttl)
+            if store.merge({job['object_id']: slim_job(job)}):
+                LOGGING.info('Stored job %s of %s %s', job['id'], job['object_type'], job['object_id'])
+        self.reply(204)
+
+    def reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def job_of_event(event):
+    '''Return the finished script or data source job of a webhook event, None for any other event.'''
+    job = event['data']
+    if not isinstance(job, dict) or job.get('object_type') not in JOB_OBJECT_TYPES:
+        return None
+    if not job.get('completed') or job['status']['value'] not in FINISHED:
+        return None
+    return job
+
+
+if __name__ == '__main__':
+    sys.exit(ReceiverNetbox().run())
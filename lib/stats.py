@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import math
+import threading
+import time
+
+
+class AgentStats:
+    '''Per endpoint request counters and timings of one agent run, safe to update from several threads.'''
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.errors = 0
+        self.overloads = 0
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, endpoint):
+        return self.endpoints.setdefault(endpoint, dict(durations=[], received=0, errors=0, retries=0))
+
+    def record(self, endpoint, duration, received, error=False, overload=False):
+        '''Record one request, overload marks errors showing Netbox unreachable or overloaded.'''
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats['durations'].append(duration)
+            stats['received'] += received
+            if error:
+                stats['errors'] += 1
+                self.errors += 1
+            if overload:
+                self.overloads += 1
+
+    def retry(self, endpoint):
+        with self._lock:
+            self._endpoint(endpoint)['retries'] += 1
+
+    def error(self):
+        '''Count an error not caused by a single request, like an object that could not be written.'''
+        with self._lock:
+            self.errors += 1
+
+    def summary(self):
+        with self._lock:
+            return dict(
+                runtime=round(time.monotonic() - self.started, 3),
+                errors=self.errors,
+                endpoints={
+                    endpoint: dict(
+                        requests=len(stats['durations']),
+                        time=round(sum(stats['durations']), 3),
+                        p95=round(percentile(stats['durations'], 95), 3),
+                        bytes=stats['received'],
+                        errors=stats['errors'],
+                        retries=stats['retries'],
+                    )
+                    for endpoint, stats in sorted(self.endpoints.items())
+                },
+            )
+
+
+def percentile(values, percent):
+    '''Nearest-rank percentile, 0 for no values.'''
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
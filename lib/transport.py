@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-License
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+from requests import ConnectionError, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError, RetryError, Timeout
+from urllib3.util.retry import Retry
+
+from cmk_addons.plugins.netbox.lib.cache import CACHE_DIR, cache_key, write_atomic
+
+RETRY_STATUS = frozenset([429, 500, 502, 503, 504])
+
+
+class TimeBudgetExceeded(Timeout):
+    '''The time budget of the agent run is used up.'''
+
+
+def is_overload(error):
+    '''Whether error shows Netbox unreachable or overloaded rather than refusing a single request.
+
+    Connection errors, timeouts, an exhausted time budget and 5xx or 429
+    responses count, a 403 or 404 of one endpoint does not.
+    '''
+    if isinstance(error, (ConnectionError, ChunkedEncodingError, RetryError, Timeout)):
+        return True
+    response = getattr(error, 'response', None)
+    return response is not None and (response.status_code >= 500 or response.status_code == 429)
+
+
+class BudgetRetry(Retry):
+    '''Retry policy which reports each retry and never sleeps past the deadline of the run.
+
+    A Retry-After is capped to backoff_max, urllib3 would otherwise wait as
+    long as a proxy asks for, even an hour.
+
+    urllib3 copies Retry objects with new() on every attempt, so the extra
+    attributes are carried over there.
+    '''
+
+    def __init__(self, *args, on_retry=None, deadline=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_retry = on_retry
+        self.deadline = deadline
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.on_retry = self.on_retry
+        retry.deadline = self.deadline
+        return retry
+
+    def increment(self, method=None, url=None, *args, **kwargs):
+        retry = super().increment(method, url, *args, **kwargs)
+        if self.on_retry:
+            self.on_retry(url)
+        return retry
+
+    def sleep(self, response=None):
+        '''Sleep for Retry-After or the backoff, a Retry-After is capped to backoff_max.'''
+        retry_after = self.respect_retry_after_header and response and self.get_retry_after(response)
+        delay = min(retry_after, self.backoff_max) if retry_after else self.get_backoff_time()
+        if self.deadline is not None and time.monotonic() + delay > self.deadline:
+            raise TimeBudgetExceeded(f'Waiting {delay:.1f}s for the next retry exceeds the time budget')
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    '''Failure counter of one Netbox kept between agent runs.
+
+    After threshold runs in a row found Netbox overloaded the breaker opens and
+    the agent stops sending requests to Netbox for cooldown seconds. The
+    first run after that is a trial: a failure opens the breaker again right
+    away, a success closes it.
+    '''
+
+    def __init__(self, url, threshold, cooldown):
+        self.path = CACHE_DIR / f'{cache_key(url)}_circuit.json'
+        self.threshold = threshold
+        self.cooldown = cooldown
+        try:
+            self.state = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.state = dict(failures=0, open_until=0)
+
+    def is_open(self):
+        return bool(self.threshold) and time.time() < self.state['open_until']
+
+    def record(self, failed):
+        if not self.threshold:
+            return
+        if failed:
+            self.state['failures'] += 1
+            if self.state['failures'] >= self.threshold:
+                self.state['open_until'] = time.time() + self.cooldown
+        else:
+            self.state = dict(failures=0, open_until=0)
+        write_atomic(self.path, json.dumps(self.state))
+
+
+class CachingAdapter(HTTPAdapter):
+    '''Transport adapter revalidating GET requests with the validators of the last response.
+
+    Responses carrying an ETag or Last-Modified header are stored on disk.
+    The next request for the same URL sends If-None-Match and
+    If-Modified-Since and a 304 response is answered with the stored body.
+    While offline is set, no requests are sent and only stored bodies are
+    returned.
+    '''
+
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = CACHE_DIR / f'http_{cache_key(url)}'
+        self.hits = 0
+        self.misses = 0
+        self.offline = False
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        if self.offline:
+            return self._send_offline(request)
+
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+
+        path = self.directory / cache_key(request.url)
+        meta = self._load_meta(path)
+        if meta.get('etag'):
+            request.headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request.headers['If-Modified-Since'] = meta['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and meta:
+            body = self._open_body(path)
+            if body is not None:
+                with self._lock:
+                    self.hits += 1
+                # Drain the empty 304 body to hand the connection back to the pool.
+                response.raw.read()
+                response.status_code = 200
+                response.headers['Content-Type'] = meta['content_type']
+                response.raw = body
+                return response
+
+        with self._lock:
+            self.misses += 1
+
+        if response.status_code == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers):
+            meta = dict(
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                content_type=response.headers.get('Content-Type'),
+            )
+            response.raw = StoringReader(response.raw, path, json.dumps(meta).encode() + b'\n')
+        return response
+
+    def _send_offline(self, request):
+        path = self.directory / cache_key(request.url)
+        meta = self._load_meta(path)
+        body = self._open_body(path) if meta and request.method == 'GET' else None
+        if body is None:
+            raise ConnectionError(f'Netbox is not contacted and there is no stored response for {request.url}', request=request)
+
+        with self._lock:
+            self.hits += 1
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers['Content-Type'] = meta['content_type']
+        response.raw = body
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def _load_meta(self, path):
+        try:
+            with path.open('rb') as f:
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            return {}
+
+    def _open_body(self, path):
+        '''Open the stored body, positioned after its meta data line.'''
+        try:
+            f = path.open('rb')
+        except OSError:
+            return None
+        os.utime(path)
+        f.readline()
+        return f
+
+    def prune(self, max_age):
+        '''Remove the stored responses not used within max_age seconds.'''
+        if not self.directory.is_dir():
+            return
+        limit = time.time() - max_age
+        for path in self.directory.iterdir():
+            if path.stat().st_mtime < limit:
+                path.unlink(missing_ok=True)
+
+
+class StoringReader:
+    '''Wrap a raw response body and store a copy of it at path once it has been read completely.
+
+    The body is written to a temporary file while it is read, so storing a
+    response does not keep it in memory.
+    '''
+
+    def __init__(self, raw, path, header):
+        self.raw = raw
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp = tempfile.NamedTemporaryFile('wb', dir=path.parent, prefix=f'.{path.name}.', delete=False)
+        self.tmp.write(header)
+
+    def read(self, amt=None, **kwargs):
+        data = self.raw.read(amt, decode_content=True)
+        if self.tmp is not None:
+            if data:
+                self.tmp.write(data)
+            else:
+                self.tmp.close()
+                os.replace(self.tmp.name, self.path)
+                self.tmp = None
+        return data
+
+    def stream(self, amt=2**16, decode_content=None):
+        while data := self.read(amt):
+            yield data
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
@@ -17,22 +17,36 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-from cmk.rulesets.v1 import Title, Help
+from cmk.rulesets.v1 import Title, Help, Label, Message
 from cmk.rulesets.v1.form_specs import (
+    BooleanChoice,
     DefaultValue,
     DictElement,
     Dictionary,
     InputHint,
+    Integer,
+    List,
+    MatchingScope,
     migrate_to_password,
+    MultipleChoice,
+    MultipleChoiceElement,
     Password,
+    RegularExpression,
     SingleChoice,
     SingleChoiceElement,
     String,
+    TimeMagnitude,
+    TimeSpan,
     validators,
 )
 from cmk.rulesets.v1.rule_specs import SpecialAgent, Topic
 
 
+def _validate_shard(value):
+    if value['index'] > value['count']:
+        raise validators.ValidationError(Message('The shard of this host must not exceed the number of shards.'))
+
+
 def _form_special_agents_netbox() -> Dictionary:
     return Dictionary(
         title=Title("Netbox Server"),
@@ -67,6 +81,333 @@ def _form_special_agents_netbox() -> Dictionary:
                 ),
                 required=True,
             ),
+            'api': DictElement(
+                parameter_form=SingleChoice(
+                    title=Title('API'),
+                    help_text=Help('With GraphQL the scripts and data sources are fetched in a single query. '
+                                   'The agent falls back to the REST API if the query fails.'),
+                    elements=[
+                        SingleChoiceElement(name='rest', title=Title('REST')),
+                        SingleChoiceElement(name='graphql', title=Title('GraphQL')),
+                    ],
+                    prefill=DefaultValue('rest'),
+                ),
+                required=False,
+            ),
+            'max_concurrency': DictElement(
+                parameter_form=Integer(
+                    title=Title('Maximal number of parallel requests'),
+                    help_text=Help('Number of requests the agent sends to Netbox at the same time.'),
+                    prefill=DefaultValue(4),
+                    custom_validate=(validators.NumberInRange(min_value=1),),
+                ),
+                required=False,
+            ),
+            'page_size': DictElement(
+                parameter_form=Integer(
+                    title=Title('Page size'),
+                    help_text=Help('Number of objects fetched per request from Netbox list endpoints. '
+                                   'Netbox caps this at its MAX_PAGE_SIZE setting.'),
+                    prefill=DefaultValue(250),
+                    custom_validate=(validators.NumberInRange(min_value=1),),
+                ),
+                required=False,
+            ),
+            'cache_ttl': DictElement(
+                parameter_form=TimeSpan(
+                    title=Title('Job cache lifetime'),
+                    help_text=Help('Completed jobs are cached between agent runs and only newer jobs are fetched. '
+                                   'After this time the jobs of deleted scripts and data sources are dropped '
+                                   'and the data sources are fetched again in full. Zero disables the cache.'),
+                    displayed_magnitudes=[TimeMagnitude.HOUR, TimeMagnitude.MINUTE],
+                    prefill=DefaultValue(3600.0),
+                ),
+                required=False,
+            ),
+            'incremental': DictElement(
+                parameter_form=BooleanChoice(
+                    title=Title('Incremental data source updates'),
+                    label=Label('Only fetch data sources changed or synced since the last run'),
+                    help_text=Help('Keeps a snapshot of the data sources which is refreshed in full after the job cache lifetime.'),
+                    prefill=DefaultValue(False),
+                ),
+                required=False,
+            ),
+            'job_queue': DictElement(
+                parameter_form=BooleanChoice(
+                    title=Title('Job queue'),
+                    label=Label('Monitor the job queue and RQ workers'),
+                    help_text=Help('Counts the pending, scheduled and running jobs with one small request each '
+                                   'and reads the running RQ workers from the Netbox status.'),
+                    prefill=DefaultValue(False),
+                ),
+                required=False,
+            ),
+            'timeouts': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('HTTP timeouts'),
+                    elements={
+                        'connect': DictElement(
+                            parameter_form=TimeSpan(
+                                title=Title('Connect timeout'),
+                                displayed_magnitudes=[TimeMagnitude.SECOND, TimeMagnitude.MILLISECOND],
+                                prefill=DefaultValue(5.0),
+                            ),
+                            required=False,
+                        ),
+                        'read': DictElement(
+                            parameter_form=TimeSpan(
+                                title=Title('Read timeout'),
+                                displayed_magnitudes=[TimeMagnitude.SECOND, TimeMagnitude.MILLISECOND],
+                                prefill=DefaultValue(10.0),
+                            ),
+                            required=False,
+                        ),
+                    },
+                ),
+                required=False,
+            ),
+            'retries': DictElement(
+                parameter_form=Integer(
+                    title=Title('Retries'),
+                    help_text=Help('Retries of a request after a connection error, a server error or a 429 response. '
+                                   'The agent waits with exponential backoff and honours the Retry-After header up to 30 seconds.'),
+                    prefill=DefaultValue(3),
+                    custom_validate=(validators.NumberInRange(min_value=0),),
+                ),
+                required=False,
+            ),
+            'time_budget': DictElement(
+                parameter_form=TimeSpan(
+                    title=Title('Time budget'),
+                    help_text=Help('Time the agent may spend on requests per run. Requests and retries which '
+                                   'would exceed it are given up. The scripts and data sources are then reported '
+                                   'with the last good data, showing its age.'),
+                    displayed_magnitudes=[TimeMagnitude.MINUTE, TimeMagnitude.SECOND],
+                    prefill=DefaultValue(50.0),
+                ),
+                required=False,
+            ),
+            'circuit_breaker': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Circuit breaker'),
+                    help_text=Help('After a number of failed runs in a row the agent stops contacting Netbox '
+                                   'for a while and reports cached data only.'),
+                    elements={
+                        'threshold': DictElement(
+                            parameter_form=Integer(
+                                title=Title('Failed runs until the breaker opens'),
+                                help_text=Help('Zero disables the circuit breaker.'),
+                                prefill=DefaultValue(3),
+                                custom_validate=(validators.NumberInRange(min_value=0),),
+                            ),
+                            required=False,
+                        ),
+                        'cooldown': DictElement(
+                            parameter_form=TimeSpan(
+                                title=Title('Time the breaker stays open'),
+                                displayed_magnitudes=[TimeMagnitude.MINUTE, TimeMagnitude.SECOND],
+                                prefill=DefaultValue(300.0),
+                            ),
+                            required=False,
+                        ),
+                    },
+                ),
+                required=False,
+            ),
+            'reconcile_interval': DictElement(
+                parameter_form=TimeSpan(
+                    title=Title('Poll jobs only for reconciliation'),
+                    help_text=Help('With a netbox receiver getting the finished jobs from Netbox webhooks, '
+                                   'the jobs are only polled this often to catch lost events.'),
+                    displayed_magnitudes=[TimeMagnitude.HOUR, TimeMagnitude.MINUTE],
+                    prefill=DefaultValue(900.0),
+                ),
+                required=False,
+            ),
+            'follow_schedule': DictElement(
+                parameter_form=BooleanChoice(
+                    title=Title('Poll jobs by their schedule'),
+                    label=Label('Only poll the jobs once the next scheduled run is due'),
+                    help_text=Help('Scripts and data sources run on a schedule can not have a new result before their next run. '
+                                   'Until then the last results are used. Results of jobs run by hand show up with the next '
+                                   'due run or after the job cache lifetime.'),
+                    prefill=DefaultValue(False),
+                ),
+                required=False,
+            ),
+            'collector_max_age': DictElement(
+                parameter_form=TimeSpan(
+                    title=Title('Use the output of the netbox collector'),
+                    help_text=Help('Write the latest output of a netbox collector started with the same arguments, '
+                                   'as long as it is not older than this. Otherwise Netbox is queried directly.'),
+                    displayed_magnitudes=[TimeMagnitude.MINUTE, TimeMagnitude.SECOND],
+                    prefill=DefaultValue(180.0),
+                ),
+                required=False,
+            ),
+            'instances': DictElement(
+                parameter_form=List(
+                    title=Title('Additional Netbox instances'),
+                    help_text=Help('Further Netbox servers queried in the same agent run, at the same time as the one above.'),
+                    element_template=Dictionary(
+                        elements={
+                            'name': DictElement(
+                                parameter_form=String(
+                                    title=Title('Name'),
+                                    help_text=Help('Used as item prefix or piggyback host name.'),
+                                    custom_validate=(validators.LengthInRange(min_value=1),),
+                                ),
+                                required=True,
+                            ),
+                            'url': DictElement(
+                                parameter_form=String(
+                                    title=Title('URL of the Netbox Rest API, e.g. https://netbox.example.com/api'),
+                                    custom_validate=(
+                                        validators.Url(
+                                            [validators.UrlProtocol.HTTP, validators.UrlProtocol.HTTPS],
+                                        ),
+                                    ),
+                                ),
+                                required=True,
+                            ),
+                            'token': DictElement(
+                                parameter_form=Password(
+                                    title=Title('Netbox Token'),
+                                ),
+                                required=True,
+                            ),
+                        },
+                    ),
+                ),
+                required=False,
+            ),
+            'instance_mode': DictElement(
+                parameter_form=SingleChoice(
+                    title=Title('Results of additional instances'),
+                    elements=[
+                        SingleChoiceElement(name='prefix', title=Title('Prefix the items with the instance name')),
+                        SingleChoiceElement(name='piggyback', title=Title('Piggyback host named like the instance')),
+                    ],
+                    prefill=DefaultValue('prefix'),
+                ),
+                required=False,
+            ),
+            'filters': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Monitored scripts and data sources'),
+                    help_text=Help('Only these scripts and data sources are fetched from Netbox and monitored. '
+                                   'The filters are sent to Netbox where possible and applied by the agent as well.'),
+                    elements={
+                        'script_modules': DictElement(
+                            parameter_form=List(
+                                title=Title('Script modules'),
+                                help_text=Help('IDs of the script modules whose scripts are monitored.'),
+                                element_template=Integer(
+                                    custom_validate=(validators.NumberInRange(min_value=1),),
+                                ),
+                            ),
+                            required=False,
+                        ),
+                        'script_include': DictElement(
+                            parameter_form=RegularExpression(
+                                title=Title('Include scripts'),
+                                predefined_help_text=MatchingScope.INFIX,
+                            ),
+                            required=False,
+                        ),
+                        'script_exclude': DictElement(
+                            parameter_form=RegularExpression(
+                                title=Title('Exclude scripts'),
+                                predefined_help_text=MatchingScope.INFIX,
+                            ),
+                            required=False,
+                        ),
+                        'data_source_include': DictElement(
+                            parameter_form=RegularExpression(
+                                title=Title('Include data sources'),
+                                predefined_help_text=MatchingScope.INFIX,
+                            ),
+                            required=False,
+                        ),
+                        'data_source_exclude': DictElement(
+                            parameter_form=RegularExpression(
+                                title=Title('Exclude data sources'),
+                                predefined_help_text=MatchingScope.INFIX,
+                            ),
+                            required=False,
+                        ),
+                        'data_source_enabled_only': DictElement(
+                            parameter_form=BooleanChoice(
+                                title=Title('Enabled data sources'),
+                                label=Label('Only monitor enabled data sources'),
+                                prefill=DefaultValue(False),
+                            ),
+                            required=False,
+                        ),
+                    },
+                ),
+                required=False,
+            ),
+            'shard': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Shard'),
+                    help_text=Help('Spread a large Netbox over several hosts, each with a rule of the same number of shards '
+                                   'and its own shard. The scripts, data sources and objects are assigned to the shards by '
+                                   'their name. Changing the number of shards only moves the items of about one shard.'),
+                    elements={
+                        'index': DictElement(
+                            parameter_form=Integer(
+                                title=Title('Shard of this host'),
+                                custom_validate=(validators.NumberInRange(min_value=1),),
+                            ),
+                            required=True,
+                        ),
+                        'count': DictElement(
+                            parameter_form=Integer(
+                                title=Title('Number of shards'),
+                                custom_validate=(validators.NumberInRange(min_value=1),),
+                            ),
+                            required=True,
+                        ),
+                    },
+                    custom_validate=(_validate_shard,),
+                ),
+                required=False,
+            ),
+            'piggyback': DictElement(
+                parameter_form=Dictionary(
+                    title=Title('Piggyback hosts'),
+                    help_text=Help('Route the results to other hosts instead of the Netbox host itself. The script and '
+                                   'data source items of additional instances on these hosts are prefixed with the instance name.'),
+                    elements={
+                        'scripts': DictElement(
+                            parameter_form=String(
+                                title=Title('Host for the script results'),
+                            ),
+                            required=False,
+                        ),
+                        'data_sources': DictElement(
+                            parameter_form=String(
+                                title=Title('Host for the data source results'),
+                            ),
+                            required=False,
+                        ),
+                        'objects': DictElement(
+                            parameter_form=MultipleChoice(
+                                title=Title('Object status'),
+                                help_text=Help('Report the Netbox status of each of these objects to a host named like the object.'),
+                                elements=[
+                                    MultipleChoiceElement(name='devices', title=Title('Devices')),
+                                    MultipleChoiceElement(name='virtual-machines', title=Title('Virtual machines')),
+                                ],
+                            ),
+                            required=False,
+                        ),
+                    },
+                ),
+                required=False,
+            ),
         },
     )
 
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# Netbox Agent Endpoint Statistics
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from cmk.rulesets.v1 import Help, Title
+from cmk.rulesets.v1.form_specs import (
+    DictElement,
+    Dictionary,
+    InputHint,
+    Integer,
+    LevelDirection,
+    migrate_to_float_simple_levels,
+    migrate_to_integer_simple_levels,
+    SimpleLevels,
+    TimeMagnitude,
+    TimeSpan,
+)
+from cmk.rulesets.v1.rule_specs import CheckParameters, Topic, HostAndItemCondition
+
+
+def _parameter_form_netbox_agent_endpoint():
+    return Dictionary(
+        elements={
+            'latency': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal 95th percentile request latency'),
+                    help_text=Help('Thresholds for the 95th percentile of the request latency of this endpoint in one agent run.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=TimeSpan(
+                        displayed_magnitudes=[TimeMagnitude.SECOND, TimeMagnitude.MILLISECOND]
+                    ),
+                    migrate=migrate_to_float_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(2.0, 5.0)),
+                ),
+                required=False,
+            ),
+            'errors': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal number of failed requests'),
+                    help_text=Help('Thresholds for the failed requests to this endpoint in one agent run.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=Integer(),
+                    migrate=migrate_to_integer_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(1, 10)),
+                ),
+                required=False,
+            ),
+        }
+    )
+
+
+rule_spec_netbox_agent_endpoint = CheckParameters(
+    name='netbox_agent_endpoint',
+    topic=Topic.APPLICATIONS,
+    parameter_form=_parameter_form_netbox_agent_endpoint,
+    title=Title('Netbox Agent Endpoint'),
+    help_text=Help('This rule configures thresholds for the requests the Netbox special agent sends to one API endpoint.'),
+    condition=HostAndItemCondition(item_title=Title('Netbox API endpoint')),
+)
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# Netbox Agent Statistics
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from cmk.rulesets.v1 import Help, Title
+from cmk.rulesets.v1.form_specs import (
+    DictElement,
+    Dictionary,
+    InputHint,
+    Integer,
+    LevelDirection,
+    migrate_to_float_simple_levels,
+    migrate_to_integer_simple_levels,
+    SimpleLevels,
+    TimeMagnitude,
+    TimeSpan,
+)
+from cmk.rulesets.v1.rule_specs import CheckParameters, Topic, HostCondition
+
+
+def _parameter_form_netbox_agent_stats():
+    return Dictionary(
+        elements={
+            'runtime': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal agent runtime'),
+                    help_text=Help('Thresholds for the time the Netbox special agent takes for one run.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=TimeSpan(
+                        displayed_magnitudes=[TimeMagnitude.MINUTE, TimeMagnitude.SECOND]
+                    ),
+                    migrate=migrate_to_float_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(30.0, 50.0)),
+                ),
+                required=False,
+            ),
+            'errors': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal number of errors'),
+                    help_text=Help('Thresholds for the failed requests and objects the agent could not report in one run.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=Integer(),
+                    migrate=migrate_to_integer_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(1, 10)),
+                ),
+                required=False,
+            ),
+        }
+    )
+
+
+rule_spec_netbox_agent_stats = CheckParameters(
+    name='netbox_agent_stats',
+    topic=Topic.APPLICATIONS,
+    parameter_form=_parameter_form_netbox_agent_stats,
+    title=Title('Netbox Agent'),
+    help_text=Help('This rule configures thresholds for the runtime and errors of the Netbox special agent.'),
+    condition=HostCondition(),
+)
@@ -49,6 +49,19 @@ def _parameter_form_netbox_data_source():
                 ),
                 required=False,
             ),
+            'cache_age': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal age of cached data'),
+                    help_text=Help('Thresholds for the age of the last good data the agent reports while Netbox is unavailable.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=TimeSpan(
+                        displayed_magnitudes=[TimeMagnitude.DAY, TimeMagnitude.HOUR, TimeMagnitude.MINUTE]
+                    ),
+                    migrate=migrate_to_float_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(1800, 3600)),
+                ),
+                required=False,
+            ),
         }
     )
 
@@ -0,0 +1,98 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# Netbox Reports Last Run
+#
+# Copyright (C) 2023  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+
+from cmk.rulesets.v1 import Help, Title
+from cmk.rulesets.v1.form_specs import (
+    DictElement,
+    Dictionary,
+    InputHint,
+    Integer,
+    LevelDirection,
+    migrate_to_float_simple_levels,
+    migrate_to_integer_simple_levels,
+    Percentage,
+    SimpleLevels,
+    TimeMagnitude,
+    TimeSpan,
+)
+from cmk.rulesets.v1.rule_specs import CheckParameters, Topic, HostAndItemCondition
+
+
+def _parameter_form_netbox_job_queue():
+    return Dictionary(
+        elements={
+            'pending': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal number of pending jobs'),
+                    help_text=Help('Thresholds for the jobs waiting for an RQ worker.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=Integer(),
+                    migrate=migrate_to_integer_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(10, 50)),
+                ),
+                required=False,
+            ),
+            'oldest_pending': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal wait of the oldest pending job'),
+                    help_text=Help('Thresholds for the time since the oldest pending job was created.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=TimeSpan(
+                        displayed_magnitudes=[TimeMagnitude.HOUR, TimeMagnitude.MINUTE, TimeMagnitude.SECOND]
+                    ),
+                    migrate=migrate_to_float_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(300.0, 900.0)),
+                ),
+                required=False,
+            ),
+            'workers': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Minimal number of RQ workers'),
+                    help_text=Help('Thresholds for the RQ workers Netbox reports as running.'),
+                    level_direction=LevelDirection.LOWER,
+                    form_spec_template=Integer(),
+                    migrate=migrate_to_integer_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(1, 1)),
+                ),
+                required=False,
+            ),
+            'utilization': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal worker utilization'),
+                    help_text=Help('Thresholds for the running jobs in percent of the RQ workers.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=Percentage(),
+                    migrate=migrate_to_float_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(80.0, 100.0)),
+                ),
+                required=False,
+            ),
+        }
+    )
+
+
+rule_spec_netbox_job_queue = CheckParameters(
+    name='netbox_job_queue',
+    topic=Topic.APPLICATIONS,
+    parameter_form=_parameter_form_netbox_job_queue,
+    title=Title('Netbox Job Queue'),
+    help_text=Help('This rule configures thresholds for the job queue and RQ workers of Netbox.'),
+    condition=HostAndItemCondition(item_title=Title('Netbox instance')),
+)
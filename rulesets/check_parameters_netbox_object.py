@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# Netbox Object Status
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+from cmk.rulesets.v1 import Help, Title
+from cmk.rulesets.v1.form_specs import (
+    DefaultValue,
+    DictElement,
+    Dictionary,
+    ServiceState,
+)
+from cmk.rulesets.v1.rule_specs import CheckParameters, Topic, HostCondition
+
+STATUS_STATES = [
+    ('active', Title('Active'), ServiceState.OK),
+    ('planned', Title('Planned'), ServiceState.WARN),
+    ('staged', Title('Staged'), ServiceState.WARN),
+    ('inventory', Title('Inventory'), ServiceState.WARN),
+    ('decommissioning', Title('Decommissioning'), ServiceState.WARN),
+    ('offline', Title('Offline'), ServiceState.CRIT),
+    ('failed', Title('Failed'), ServiceState.CRIT),
+    ('other', Title('Any other status'), ServiceState.UNKNOWN),
+]
+
+
+def _parameter_form_netbox_object():
+    return Dictionary(
+        title=Title('Service state per Netbox status'),
+        elements={
+            name: DictElement(
+                parameter_form=ServiceState(
+                    title=title,
+                    prefill=DefaultValue(state),
+                ),
+                required=False,
+            )
+            for name, title, state in STATUS_STATES
+        }
+    )
+
+
+rule_spec_netbox_object = CheckParameters(
+    name='netbox_object',
+    topic=Topic.APPLICATIONS,
+    parameter_form=_parameter_form_netbox_object,
+    title=Title('Netbox Object Status'),
+    help_text=Help('This rule maps the Netbox status of devices and virtual machines to service states.'),
+    condition=HostCondition(),
+)
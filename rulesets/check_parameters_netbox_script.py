@@ -21,11 +21,14 @@
 
 from cmk.rulesets.v1 import Help, Title
 from cmk.rulesets.v1.form_specs import (
+    DefaultValue,
     DictElement,
     Dictionary,
     InputHint,
     LevelDirection,
+    Levels,
     migrate_to_float_simple_levels,
+    PredictiveLevels,
     SimpleLevels,
     TimeMagnitude,
     TimeSpan,
@@ -49,6 +52,49 @@ def _parameter_form_netbox_script():
                 ),
                 required=False,
             ),
+            'runtime': DictElement(
+                parameter_form=Levels(
+                    title=Title('Maximal runtime'),
+                    help_text=Help('Thresholds for the time the last job of the script ran. Predictive levels '
+                                   'catch a runtime growing slowly beyond its usual range before it overruns the schedule.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=TimeSpan(
+                        displayed_magnitudes=[TimeMagnitude.HOUR, TimeMagnitude.MINUTE, TimeMagnitude.SECOND]
+                    ),
+                    prefill_fixed_levels=InputHint(value=(600.0, 1800.0)),
+                    predictive=PredictiveLevels(
+                        reference_metric='netbox_script_runtime',
+                        prefill_abs_diff=DefaultValue((60.0, 300.0)),
+                    ),
+                ),
+                required=False,
+            ),
+            'queue_wait': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal queue wait'),
+                    help_text=Help('Thresholds for the time the last job of the script waited for a worker.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=TimeSpan(
+                        displayed_magnitudes=[TimeMagnitude.HOUR, TimeMagnitude.MINUTE, TimeMagnitude.SECOND]
+                    ),
+                    migrate=migrate_to_float_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(300.0, 900.0)),
+                ),
+                required=False,
+            ),
+            'cache_age': DictElement(
+                parameter_form=SimpleLevels(
+                    title=Title('Maximal age of cached data'),
+                    help_text=Help('Thresholds for the age of the last good data the agent reports while Netbox is unavailable.'),
+                    level_direction=LevelDirection.UPPER,
+                    form_spec_template=TimeSpan(
+                        displayed_magnitudes=[TimeMagnitude.DAY, TimeMagnitude.HOUR, TimeMagnitude.MINUTE]
+                    ),
+                    migrate=migrate_to_float_simple_levels,
+                    prefill_fixed_levels=InputHint(value=(1800, 3600)),
+                ),
+                required=False,
+            ),
         }
     )
 
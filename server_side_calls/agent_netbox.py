@@ -24,10 +24,64 @@ from pydantic import BaseModel
 from cmk.server_side_calls.v1 import HostConfig, Secret, SpecialAgentCommand, SpecialAgentConfig
 
 
+class Filters(BaseModel):
+    script_modules: list[int] = []
+    script_include: str | None = None
+    script_exclude: str | None = None
+    data_source_include: str | None = None
+    data_source_exclude: str | None = None
+    data_source_enabled_only: bool = False
+
+
+class Shard(BaseModel):
+    index: int
+    count: int
+
+
+class Piggyback(BaseModel):
+    scripts: str | None = None
+    data_sources: str | None = None
+    objects: list[str] = []
+
+
+class Timeouts(BaseModel):
+    connect: float | None = None
+    read: float | None = None
+
+
+class CircuitBreaker(BaseModel):
+    threshold: int | None = None
+    cooldown: float | None = None
+
+
+class Instance(BaseModel):
+    name: str
+    url: str
+    token: Secret
+
+
 class Params(BaseModel):
     url: str
     token: Secret
     ignore_cert: str = 'check_cert'
+    api: str = 'rest'
+    max_concurrency: int | None = None
+    page_size: int | None = None
+    cache_ttl: float | None = None
+    incremental: bool = False
+    job_queue: bool = False
+    timeouts: Timeouts = Timeouts()
+    retries: int | None = None
+    time_budget: float | None = None
+    circuit_breaker: CircuitBreaker = CircuitBreaker()
+    reconcile_interval: float | None = None
+    follow_schedule: bool = False
+    collector_max_age: float | None = None
+    instances: list[Instance] = []
+    instance_mode: str = 'prefix'
+    filters: Filters = Filters()
+    shard: Shard | None = None
+    piggyback: Piggyback = Piggyback()
 
 
 def commands_function(
@@ -40,6 +94,60 @@ def commands_function(
     ]
     if params.ignore_cert != 'check_cert':
         command_arguments += ['--ignore-cert']
+    if params.api != 'rest':
+        command_arguments += ['--api', params.api]
+    if params.max_concurrency is not None:
+        command_arguments += ['--max-concurrency', str(params.max_concurrency)]
+    if params.page_size is not None:
+        command_arguments += ['--page-size', str(params.page_size)]
+    if params.cache_ttl is not None:
+        command_arguments += ['--cache-ttl', str(int(params.cache_ttl))]
+    if params.incremental:
+        command_arguments += ['--incremental']
+    if params.job_queue:
+        command_arguments += ['--job-queue']
+    if params.timeouts.connect is not None:
+        command_arguments += ['--connect-timeout', str(params.timeouts.connect)]
+    if params.timeouts.read is not None:
+        command_arguments += ['--timeout', str(params.timeouts.read)]
+    if params.retries is not None:
+        command_arguments += ['--retries', str(params.retries)]
+    if params.time_budget is not None:
+        command_arguments += ['--time-budget', str(params.time_budget)]
+    if params.circuit_breaker.threshold is not None:
+        command_arguments += ['--breaker-threshold', str(params.circuit_breaker.threshold)]
+    if params.circuit_breaker.cooldown is not None:
+        command_arguments += ['--breaker-cooldown', str(int(params.circuit_breaker.cooldown))]
+    if params.reconcile_interval:
+        command_arguments += ['--reconcile-interval', str(int(params.reconcile_interval))]
+    if params.follow_schedule:
+        command_arguments += ['--follow-schedule']
+    if params.collector_max_age:
+        command_arguments += ['--collector-max-age', str(int(params.collector_max_age))]
+    for instance in params.instances:
+        command_arguments += ['--instance', instance.name, instance.url, instance.token.unsafe()]
+    if params.instance_mode != 'prefix':
+        command_arguments += ['--instance-mode', params.instance_mode]
+    for module in params.filters.script_modules:
+        command_arguments += ['--script-module', str(module)]
+    if params.filters.script_include:
+        command_arguments += ['--script-include', params.filters.script_include]
+    if params.filters.script_exclude:
+        command_arguments += ['--script-exclude', params.filters.script_exclude]
+    if params.filters.data_source_include:
+        command_arguments += ['--data-source-include', params.filters.data_source_include]
+    if params.filters.data_source_exclude:
+        command_arguments += ['--data-source-exclude', params.filters.data_source_exclude]
+    if params.filters.data_source_enabled_only:
+        command_arguments += ['--data-source-enabled-only']
+    if params.shard is not None:
+        command_arguments += ['--shard', f'{params.shard.index}/{params.shard.count}']
+    if params.piggyback.scripts:
+        command_arguments += ['--piggyback-scripts', params.piggyback.scripts]
+    if params.piggyback.data_sources:
+        command_arguments += ['--piggyback-data-sources', params.piggyback.data_sources]
+    for objects in params.piggyback.objects:
+        command_arguments += ['--piggyback-objects', objects]
     yield SpecialAgentCommand(command_arguments=command_arguments)
 
 
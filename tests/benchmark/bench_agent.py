@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+'''Benchmark the Netbox special agent against a local Netbox stand-in.
+
+Run inside the Checkmk site, arguments after -- are passed to the agent:
+
+    python3 tests/benchmark/bench_agent.py --scripts 500 --latency 0.02 --runs 3 -- --page-size 1000
+
+Each run reports the wall time, the requests and bytes served by the stub
+and the peak memory allocated by the agent. Later runs show the effect of
+the caches kept between agent runs.
+'''
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+from dataclasses import fields
+
+from netbox_stub import NetboxStub, StubConfig
+
+
+def run_agent(url, agent_args):
+    from cmk_addons.plugins.netbox.lib.agent import AgentNetbox
+
+    agent = AgentNetbox()
+    args = agent.parse_arguments(['-U', url, '-T', 'benchmark'] + agent_args)
+    output = io.StringIO()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        agent.main(args)
+    duration = time.perf_counter() - start
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak, len(output.getvalue())
+
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for field in fields(StubConfig):
+        option = '--{}'.format(field.name.replace('_', '-'))
+        if field.type is bool:
+            parser.add_argument(option, dest=field.name, action='store_true', help='Stub: send ETags and answer 304.')
+        else:
+            parser.add_argument(option, dest=field.name, type=field.type, default=field.default,
+                                help=f'Stub: {field.name} (Default: {field.default})')
+    parser.add_argument('--runs', type=int, default=1, help='Number of agent runs. (Default: 1)')
+    parser.add_argument('agent_args', nargs='*', help='Arguments passed to the agent.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    config = StubConfig(**{field.name: getattr(args, field.name) for field in fields(StubConfig)})
+
+    with NetboxStub(config) as stub:
+        print('Stub:', ', '.join(f'{k}={v}' for k, v in stub.describe().items()))
+        print(f'{"run":>4} {"wall [s]":>10} {"requests":>9} {"bytes":>12} {"peak mem [KiB]":>15} {"output [B]":>11}')
+        for run in range(1, args.runs + 1):
+            before = stub.stats()
+            duration, peak, output = run_agent(stub.api_url, args.agent_args)
+            after = stub.stats()
+            requests = after['requests'] - before['requests']
+            received = after['bytes'] - before['bytes']
+            print(f'{run:>4} {duration:>10.3f} {requests:>9} {received:>12} {peak / 1024:>15.1f} {output:>11}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
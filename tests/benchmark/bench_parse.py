@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+'''Benchmark parsing and checking large netbox_script and netbox_data_source sections.
+
+Run inside the Checkmk site:
+
+    python3 tests/benchmark/bench_parse.py --scripts 1000 --tests-per-script 20 --data-sources 1000
+
+The script section is built in the row and the record format from the same
+generated results, split like Checkmk splits the section lines and parsed
+repeatedly. The check of all script services runs on the parsed section.
+The best time of the repetitions and the section size are reported.
+'''
+
+import argparse
+import json
+import sys
+import time
+
+
+def generate(scripts, tests_per_script):
+    completed = '2024-07-01T06:00:02.842382+02:00'
+    return [
+        dict(name=f'module{n % 10}.Script{n}', status='completed', completed=completed,
+             tests={f'test_{t}': [0, t, 0, t % 2] for t in range(tests_per_script)})
+        for n in range(scripts)
+    ]
+
+
+def generate_data_sources(data_sources):
+    return [
+        dict(name=f'source{n}', description='', enabled=True, status=dict(value='completed', label='Completed'),
+             last_synced='2024-07-01T06:00:02.842382+02:00', file_count=n)
+        for n in range(data_sources)
+    ]
+
+
+def rows(records):
+    lines = []
+    for record in records:
+        lines.append(','.join([record['name'], '', record['status'], record['completed']]))
+        for test_name, counters in record['tests'].items():
+            lines.append(','.join([record['name'], test_name, record['status'], record['completed'], *map(str, counters)]))
+    return lines
+
+
+def check_all(check, section):
+    for item in section:
+        for _result in check(item, {}, section):
+            pass
+
+
+def measure(function, argument, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scripts', type=int, default=1000, help='Number of scripts. (Default: 1000)')
+    parser.add_argument('--tests-per-script', type=int, default=20, help='Number of tests per script. (Default: 20)')
+    parser.add_argument('--data-sources', type=int, default=1000, help='Number of data sources. (Default: 1000)')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of repetitions. (Default: 5)')
+    args = parser.parse_args(argv)
+
+    from cmk.base.plugins.agent_based.netbox_data_source import parse_netbox_data_source
+    from cmk.base.plugins.agent_based.netbox_script import check_netbox_script, parse_netbox_script
+
+    records = generate(args.scripts, args.tests_per_script)
+    row_lines = rows(records)
+    record_lines = [json.dumps(record) for record in records]
+    data_source_lines = [json.dumps(data_source) for data_source in generate_data_sources(args.data_sources)]
+    sections = [
+        ('script rows', parse_netbox_script, [line.split(',') for line in row_lines], row_lines),
+        ('script records', parse_netbox_script, [[line] for line in record_lines], record_lines),
+        ('data sources', parse_netbox_data_source, [[line] for line in data_source_lines], data_source_lines),
+    ]
+
+    assert parse_netbox_script(sections[0][2]) == parse_netbox_script(sections[1][2])
+
+    print(f'scripts={args.scripts}, tests_per_script={args.tests_per_script}, data_sources={args.data_sources}')
+    print(f'{"section":>14} {"lines":>8} {"size [B]":>10} {"parse [ms]":>11}')
+    for name, parse, string_table, lines in sections:
+        duration = measure(parse, string_table, args.repeat)
+        size = sum(len(line) + 1 for line in lines)
+        print(f'{name:>14} {len(string_table):>8} {size:>10} {duration * 1000:>11.2f}')
+
+    section = parse_netbox_script(sections[1][2])
+    duration = measure(lambda section: check_all(check_netbox_script, section), section, args.repeat)
+    print(f'check of {len(section)} scripts [ms]: {duration * 1000:.2f}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+'''Minimal stand-in for the parts of the Netbox API the special agent uses.
+
+The stub serves /api/extras/scripts/, /api/core/data-sources/,
+/api/core/jobs/, /api/status/ and /graphql/ from generated objects. The
+list endpoints understand the filters the agent sends: id, name__regex,
+module_id, enabled, last_updated__gte, object_type, object_id, status,
+completed__after and ordering. It runs in its own process so it does not
+skew the time and memory measured for the agent. Request and byte
+counters are available at /_stats.
+'''
+
+import hashlib
+import json
+import multiprocessing
+import re
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+from urllib.request import urlopen
+
+EPOCH = datetime(2024, 7, 1, 6, 0, tzinfo=timezone(timedelta(hours=2)))
+
+
+@dataclass
+class StubConfig:
+    scripts: int = 100
+    data_sources: int = 10
+    jobs_per_object: int = 3
+    tests_per_script: int = 5
+    log_lines: int = 100
+    queued_jobs: int = 0
+    workers: int = 2
+    default_page_size: int = 50
+    max_page_size: int = 1000
+    latency: float = 0.0
+    etag: bool = False
+
+
+def generate(config):
+    scripts = [dict(id=i, name=f'Script{i}', module=i % 10, description='Benchmark script', vars={}, is_executable=True)
+               for i in range(1, config.scripts + 1)]
+    data_sources = [dict(id=i, name=f'DataSource{i}', description='Benchmark data source', enabled=True, type='local',
+                         source_url='/tmp', status=dict(value='completed', label='Completed'),
+                         last_synced=EPOCH.isoformat(), last_updated=(EPOCH + timedelta(seconds=i)).isoformat(), file_count=i)
+                    for i in range(1, config.data_sources + 1)]
+
+    jobs = []
+    for object_type, objects in (('extras.script', scripts), ('core.datasource', data_sources)):
+        for obj in objects:
+            for run in range(config.jobs_per_object):
+                created = EPOCH + timedelta(hours=run, seconds=obj['id'])
+                data = None
+                if object_type == 'extras.script':
+                    data = dict(
+                        log=[dict(status='success', message=f'Log line {n} of {obj["name"]}') for n in range(config.log_lines)],
+                        output='',
+                        tests={f'test_{n}': dict(info=0, success=n, warning=0, failure=0) for n in range(config.tests_per_script)},
+                    )
+                jobs.append(dict(
+                    id=len(jobs) + 1,
+                    object_type=object_type,
+                    object_id=obj['id'],
+                    name=obj['name'],
+                    status=dict(value='completed', label='Completed'),
+                    created=created.isoformat(),
+                    scheduled=None,
+                    interval=None,
+                    started=(created + timedelta(seconds=1)).isoformat(),
+                    completed=(created + timedelta(seconds=5)).isoformat(),
+                    data=data,
+                ))
+
+    # Jobs waiting for or running on a worker, they are not completed yet.
+    for status in ('pending', 'scheduled', 'running'):
+        for n in range(config.queued_jobs):
+            script = scripts[n % len(scripts)]
+            created = EPOCH + timedelta(days=1, seconds=n)
+            jobs.append(dict(
+                id=len(jobs) + 1,
+                object_type='extras.script',
+                object_id=script['id'],
+                name=script['name'],
+                status=dict(value=status, label=status.capitalize()),
+                created=created.isoformat(),
+                scheduled=(created + timedelta(hours=1)).isoformat() if status == 'scheduled' else None,
+                interval=None,
+                started=created.isoformat() if status == 'running' else None,
+                completed=None,
+                data=None,
+            ))
+    return dict(scripts=scripts, data_sources=data_sources, jobs=jobs)
+
+
+def timestamp(value):
+    value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=EPOCH.tzinfo)
+
+
+def filter_objects(objects, query):
+    '''Apply the filters and the ordering of query, other parameters are ignored like Netbox does.'''
+    if 'id' in query or 'id__in' in query:
+        ids = {int(i) for value in query.get('id', []) + query.get('id__in', []) for i in value.split(',')}
+        objects = [obj for obj in objects if obj['id'] in ids]
+    if 'name__regex' in query:
+        pattern = re.compile(query['name__regex'][0])
+        objects = [obj for obj in objects if pattern.search(obj['name'])]
+    if 'module_id' in query:
+        modules = {int(i) for i in query['module_id']}
+        objects = [obj for obj in objects if obj['module'] in modules]
+    if 'enabled' in query:
+        enabled = query['enabled'][0].lower() == 'true'
+        objects = [obj for obj in objects if obj['enabled'] == enabled]
+    if 'last_updated__gte' in query:
+        after = timestamp(query['last_updated__gte'][0])
+        objects = [obj for obj in objects if timestamp(obj['last_updated']) >= after]
+    if 'object_type' in query:
+        objects = [obj for obj in objects if obj['object_type'] == query['object_type'][0]]
+    if 'object_id' in query:
+        ids = {int(i) for i in query['object_id']}
+        objects = [obj for obj in objects if obj['object_id'] in ids]
+    if 'status' in query:
+        objects = [obj for obj in objects if obj['status']['value'] in query['status']]
+    if 'completed__after' in query:
+        after = timestamp(query['completed__after'][0])
+        objects = [obj for obj in objects if obj['completed'] and timestamp(obj['completed']) >= after]
+    if 'ordering' in query:
+        field = query['ordering'][0]
+        objects = sorted(objects, key=lambda obj: obj[field.lstrip('-')] or '', reverse=field.startswith('-'))
+    return objects
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/_stats':
+            return self.send_json(self.server.stats, count=False)
+
+        if url.path == '/api/status/':
+            return self.send_json({'netbox-version': '4.0.0', 'rq-workers-running': self.server.config.workers})
+
+        objects = {
+            '/api/extras/scripts/': 'scripts',
+            '/api/core/data-sources/': 'data_sources',
+            '/api/core/jobs/': 'jobs',
+        }.get(url.path)
+        if objects is None:
+            return self.send_json(dict(detail='Not found.'), status=404)
+        self.send_json(self.page(url, query, filter_objects(self.server.data[objects], query)))
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        if urlsplit(self.path).path != '/graphql/' or 'query' not in body:
+            return self.send_json(dict(detail='Not found.'), status=404)
+        data = self.server.data
+        self.send_json(dict(data=dict(
+            script_list=[dict(id=str(s['id']), name=s['name']) for s in data['scripts']],
+            data_source_list=[dict(id=str(d['id']), name=d['name'], description=d['description'], enabled=d['enabled'],
+                                   status=d['status']['value'].upper(), last_synced=d['last_synced'],
+                                   datafiles=[dict(id=str(n)) for n in range(d['file_count'])])
+                              for d in data['data_sources']],
+        )))
+
+    def page(self, url, query, objects):
+        config = self.server.config
+        limit = min(int(query.get('limit', [config.default_page_size])[0]) or config.max_page_size, config.max_page_size)
+        offset = int(query.get('offset', ['0'])[0])
+        results = objects[offset:offset + limit]
+        if 'fields' in query:
+            fields = query['fields'][0].split(',')
+            results = [{field: obj[field] for field in fields if field in obj} for obj in results]
+
+        next = None
+        if offset + limit < len(objects):
+            query = dict(query, limit=[str(limit)], offset=[str(offset + limit)])
+            next = f'http://{self.headers["Host"]}{url.path}?{urlencode(query, doseq=True)}'
+        return dict(count=len(objects), next=next, previous=None, results=results)
+
+    def send_json(self, data, status=200, count=True):
+        if count:
+            time.sleep(self.server.config.latency)
+        body = json.dumps(data).encode()
+        etag = '"{}"'.format(hashlib.sha256(body).hexdigest()[:32])
+        if count and self.server.config.etag and self.headers.get('If-None-Match') == etag:
+            status, body = 304, b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if self.server.config.etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+        if count:
+            stats = self.server.stats
+            stats['requests'] += 1
+            stats['bytes'] += len(body)
+            stats['status'][str(status)] = stats['status'].get(str(status), 0) + 1
+            path = urlsplit(self.path).path
+            stats['paths'][path] = stats['paths'].get(path, 0) + 1
+
+
+def serve(config, port):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.data = generate(config)
+    server.stats = dict(requests=0, bytes=0, status={}, paths={})
+    port.put(server.server_port)
+    server.serve_forever()
+
+
+class NetboxStub:
+    '''Run the stub in a child process, usable as context manager.'''
+
+    def __init__(self, config):
+        self.config = config
+        self.process = None
+        self.url = None
+
+    def __enter__(self):
+        port = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=serve, args=(self.config, port), daemon=True)
+        self.process.start()
+        self.url = f'http://127.0.0.1:{port.get(timeout=60)}'
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.join()
+
+    @property
+    def api_url(self):
+        return f'{self.url}/api'
+
+    def stats(self):
+        with urlopen(f'{self.url}/_stats') as response:
+            return json.loads(response.read())
+
+    def describe(self):
+        return asdict(self.config)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import pytest  # type: ignore[import]
+from cmk.agent_based.v2 import (
+    Metric,
+    Result,
+    Service,
+    State,
+)
+from cmk.base.plugins.agent_based import netbox_agent_stats
+
+
+SAMPLE_STRING_TABLE = [
+    ['{"runtime": 83.2, "errors": 1, "endpoints": {"core/jobs/": {"requests": 3, "time": 81.5, "p95": 65.0, "bytes": 2048, "errors": 1, "retries": 2}, "extras/scripts/": {"requests": 1, "time": 1.0, "p95": 1.0, "bytes": 1024, "errors": 0, "retries": 0}}, "cache": {"hits": 1, "misses": 3}}'],
+]
+
+SAMPLE_SECTION = {
+    'runtime': 83.2,
+    'errors': 1,
+    'endpoints': {
+        'core/jobs/': {'requests': 3, 'time': 81.5, 'p95': 65.0, 'bytes': 2048, 'errors': 1, 'retries': 2},
+        'extras/scripts/': {'requests': 1, 'time': 1.0, 'p95': 1.0, 'bytes': 1024, 'errors': 0, 'retries': 0},
+    },
+    'cache': {'hits': 1, 'misses': 3},
+}
+
+
+@pytest.mark.parametrize('string_table, result', [
+    ([], None),
+    (SAMPLE_STRING_TABLE, SAMPLE_SECTION),
+])
+def test_parse_netbox_agent_stats(string_table, result):
+    assert netbox_agent_stats.parse_netbox_agent_stats(string_table) == result
+
+
+def test_discovery_netbox_agent_stats():
+    assert list(netbox_agent_stats.discovery_netbox_agent_stats(SAMPLE_SECTION)) == [Service()]
+
+
+@pytest.mark.parametrize('params, result', [
+    ({}, [
+        Result(state=State.OK, summary='Runtime: 1 minute 23 seconds'),
+        Metric('netbox_runtime', 83.2),
+        Result(state=State.OK, summary='Requests: 4'),
+        Metric('netbox_requests', 4.0),
+        Result(state=State.OK, summary='Received: 3.00 KiB'),
+        Metric('netbox_bytes', 3072.0),
+        Result(state=State.OK, summary='Errors: 1'),
+        Metric('netbox_errors', 1.0),
+        Result(state=State.OK, notice='Retries: 2'),
+        Metric('netbox_retries', 2.0),
+        Result(state=State.OK, notice='HTTP cache hits: 1, misses: 3'),
+        Metric('netbox_cache_hits', 1.0),
+        Metric('netbox_cache_misses', 3.0),
+    ]),
+    ({'runtime': ('fixed', (60.0, 80.0)), 'errors': ('fixed', (1, 10))}, [
+        Result(state=State.CRIT, summary='Runtime: 1 minute 23 seconds (warn/crit at 1 minute 0 seconds/1 minute 20 seconds)'),
+        Metric('netbox_runtime', 83.2, levels=(60.0, 80.0)),
+        Result(state=State.OK, summary='Requests: 4'),
+        Metric('netbox_requests', 4.0),
+        Result(state=State.OK, summary='Received: 3.00 KiB'),
+        Metric('netbox_bytes', 3072.0),
+        Result(state=State.WARN, summary='Errors: 1 (warn/crit at 1/10)'),
+        Metric('netbox_errors', 1.0, levels=(1.0, 10.0)),
+        Result(state=State.OK, notice='Retries: 2'),
+        Metric('netbox_retries', 2.0),
+        Result(state=State.OK, notice='HTTP cache hits: 1, misses: 3'),
+        Metric('netbox_cache_hits', 1.0),
+        Metric('netbox_cache_misses', 3.0),
+    ]),
+])
+def test_check_netbox_agent_stats(params, result):
+    assert list(netbox_agent_stats.check_netbox_agent_stats(params, SAMPLE_SECTION)) == result
+
+
+def test_check_netbox_agent_stats_circuit_breaker():
+    section = dict(SAMPLE_SECTION, circuit_breaker='open')
+    assert list(netbox_agent_stats.check_netbox_agent_stats({}, section))[0] == Result(
+        state=State.WARN, summary='Circuit breaker open, serving cached data',
+    )
+
+
+def test_discovery_netbox_agent_endpoint():
+    assert list(netbox_agent_stats.discovery_netbox_agent_endpoint(SAMPLE_SECTION)) == [
+        Service(item='core/jobs/'),
+        Service(item='extras/scripts/'),
+    ]
+
+
+@pytest.mark.parametrize('item, params, result', [
+    ('unknown/', {}, [Result(state=State.OK, summary='No requests this run'), Metric('netbox_requests', 0.0)]),
+    ('core/jobs/', {'latency': ('fixed', (60.0, 120.0)), 'errors': ('fixed', (1, 10))}, [
+        Result(state=State.OK, summary='Requests: 3'),
+        Metric('netbox_requests', 3.0),
+        Result(state=State.OK, summary='Total time: 1 minute 21 seconds'),
+        Metric('netbox_request_time', 81.5),
+        Result(state=State.WARN, summary='95th percentile latency: 1 minute 5 seconds (warn/crit at 1 minute 0 seconds/2 minutes 0 seconds)'),
+        Metric('netbox_request_latency', 65.0, levels=(60.0, 120.0)),
+        Result(state=State.OK, summary='Received: 2.00 KiB'),
+        Metric('netbox_bytes', 2048.0),
+        Result(state=State.WARN, summary='Errors: 1 (warn/crit at 1/10)'),
+        Metric('netbox_errors', 1.0, levels=(1.0, 10.0)),
+        Result(state=State.OK, notice='Retries: 2'),
+        Metric('netbox_retries', 2.0),
+    ]),
+])
+def test_check_netbox_agent_endpoint(item, params, result):
+    assert list(netbox_agent_stats.check_netbox_agent_endpoint(item, params, SAMPLE_SECTION)) == result
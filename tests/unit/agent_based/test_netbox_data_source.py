@@ -21,6 +21,7 @@
 
 import pytest  # type: ignore[import]
 import datetime
+from dataclasses import replace
 from freezegun import freeze_time
 from cmk.agent_based.v2 import (
     Metric,
@@ -36,7 +37,15 @@ SAMPLE_STRING_TABLE = [
 ]
 
 SAMPLE_SECTION = {
-    "test": {"name": "test", "description": "test", "enabled": True, "status": {"value": "completed", "label": "Completed"}, "last_synced": datetime.datetime(2023, 5, 3, 13, 13, 29, 965921), "file_count": 1}
+    "test": netbox_data_source.DataSource(
+        name="test",
+        description="test",
+        enabled=True,
+        status="completed",
+        status_label="Completed",
+        last_synced=datetime.datetime(2023, 5, 3, 13, 13, 29, 965921),
+        file_count=1,
+    ),
 }
 
 
@@ -46,6 +55,10 @@ SAMPLE_SECTION = {
         SAMPLE_STRING_TABLE,
         SAMPLE_SECTION
     ),
+    (
+        [['{"cached": 1683181809.5}']] + SAMPLE_STRING_TABLE,
+        {'test': replace(SAMPLE_SECTION['test'], cached=datetime.datetime.fromtimestamp(1683181809.5))},
+    ),
 ])
 def test_parse_netbox_report(string_table, result):
     assert netbox_data_source.parse_netbox_data_source(string_table) == result
@@ -63,6 +76,20 @@ def test_discovery_netbox_data_source(section, result):
 @pytest.mark.parametrize('section, params, result', [
     (SAMPLE_SECTION, {}, [Result(state=State.OK, summary='Last Sync: 17 hours 41 minutes'), Metric('file', 1.0)]),
     (SAMPLE_SECTION, {'maxage': ('fixed', (2 * 3600, 7 * 3600))}, [Result(state=State.CRIT, summary='Last Sync: 17 hours 41 minutes (warn/crit at 2 hours 0 minutes/7 hours 0 minutes)'), Metric('file', 1.0)]),
+    ({'test': replace(SAMPLE_SECTION['test'], cached=datetime.datetime(2023, 5, 4, 6, 25))}, {}, [
+        Result(state=State.OK, summary='Netbox unavailable, data age: 30 minutes 0 seconds'),
+        Result(state=State.OK, summary='Last Sync: 17 hours 41 minutes'),
+        Metric('file', 1.0),
+    ]),
+    ({'test': replace(SAMPLE_SECTION['test'], last_synced=None)}, {}, [
+        Result(state=State.UNKNOWN, summary='DataSource "test" not yet synced'),
+        Metric('file', 1.0),
+    ]),
+    ({'test': replace(SAMPLE_SECTION['test'], status='failed', status_label='Failed')}, {}, [
+        Result(state=State.CRIT, summary='Status is Failed'),
+        Result(state=State.OK, summary='Last Sync: 17 hours 41 minutes'),
+        Metric('file', 1.0),
+    ]),
 ])
 def test_check_netbox_data_source(section, params, result):
     assert list(netbox_data_source.check_netbox_data_source('test', params, section)) == result
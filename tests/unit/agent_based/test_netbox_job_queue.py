@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import pytest  # type: ignore[import]
+import datetime
+from freezegun import freeze_time
+from cmk.agent_based.v2 import (
+    Metric,
+    Result,
+    Service,
+    State,
+)
+from cmk.base.plugins.agent_based import netbox_job_queue
+
+
+SAMPLE_STRING_TABLE = [
+    ['{"name": "netbox.example.com", "pending": 3, "oldest_pending": "2024-07-02T06:50:00+02:00", "scheduled": 12, "running": 2, "workers": 2}'],
+]
+
+SAMPLE_SECTION = {
+    'netbox.example.com': netbox_job_queue.JobQueue(
+        pending=3,
+        scheduled=12,
+        running=2,
+        workers=2,
+        oldest_pending=datetime.datetime(2024, 7, 2, 6, 50),
+    ),
+}
+
+PARAMS = {'oldest_pending': ('fixed', (300.0, 900.0)), 'workers': ('fixed', (1, 1))}
+
+
+@pytest.mark.parametrize('string_table, result', [
+    ([], {}),
+    (SAMPLE_STRING_TABLE, SAMPLE_SECTION),
+    (
+        [['{"name": "netbox.example.com", "pending": 0, "oldest_pending": null, "scheduled": 0, "running": 0, "workers": 0}']],
+        {'netbox.example.com': netbox_job_queue.JobQueue(pending=0, scheduled=0, running=0, workers=0, oldest_pending=None)},
+    ),
+])
+def test_parse_netbox_job_queue(string_table, result):
+    assert netbox_job_queue.parse_netbox_job_queue(string_table) == result
+
+
+@pytest.mark.parametrize('section, result', [
+    ({}, []),
+    (SAMPLE_SECTION, [Service(item='netbox.example.com')]),
+])
+def test_discovery_netbox_job_queue(section, result):
+    assert list(netbox_job_queue.discovery_netbox_job_queue(section)) == result
+
+
+@freeze_time('2024-07-02 06:55')
+@pytest.mark.parametrize('section, params, result', [
+    (SAMPLE_SECTION, PARAMS, [
+        Result(state=State.OK, summary='Pending jobs: 3'),
+        Metric('netbox_jobs_pending', 3.0),
+        Result(state=State.WARN, summary='Oldest pending job waiting: 5 minutes 0 seconds (warn/crit at 5 minutes 0 seconds/15 minutes 0 seconds)'),
+        Metric('netbox_job_wait', 300.0, levels=(300.0, 900.0)),
+        Result(state=State.OK, summary='Running jobs: 2'),
+        Metric('netbox_jobs_running', 2.0),
+        Result(state=State.OK, notice='Scheduled jobs: 12'),
+        Metric('netbox_jobs_scheduled', 12.0),
+        Result(state=State.OK, summary='RQ workers: 2'),
+        Metric('netbox_rq_workers', 2.0),
+        Result(state=State.OK, summary='Worker utilization: 100.00%'),
+        Metric('netbox_rq_worker_utilization', 100.0),
+    ]),
+    ({'netbox.example.com': netbox_job_queue.JobQueue(pending=0, scheduled=0, running=0, workers=0, oldest_pending=None)}, PARAMS, [
+        Result(state=State.OK, summary='Pending jobs: 0'),
+        Metric('netbox_jobs_pending', 0.0),
+        Result(state=State.OK, summary='Oldest pending job waiting: 0 seconds'),
+        Metric('netbox_job_wait', 0.0, levels=(300.0, 900.0)),
+        Result(state=State.OK, summary='Running jobs: 0'),
+        Metric('netbox_jobs_running', 0.0),
+        Result(state=State.OK, notice='Scheduled jobs: 0'),
+        Metric('netbox_jobs_scheduled', 0.0),
+        Result(state=State.CRIT, summary='RQ workers: 0 (warn/crit below 1/1)'),
+        Metric('netbox_rq_workers', 0.0),
+    ]),
+])
+def test_check_netbox_job_queue(section, params, result):
+    assert list(netbox_job_queue.check_netbox_job_queue('netbox.example.com', params, section)) == result
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import pytest  # type: ignore[import]
+from cmk.agent_based.v2 import (
+    Result,
+    Service,
+    State,
+)
+from cmk.base.plugins.agent_based import netbox_object
+
+
+SAMPLE_STRING_TABLE = [
+    ['{"type": "device", "id": 17, "status": {"value": "active", "label": "Active"}, "site": "HQ"}'],
+]
+
+SAMPLE_SECTION = {'type': 'device', 'id': 17, 'status': {'value': 'active', 'label': 'Active'}, 'site': 'HQ'}
+
+DEFAULT_PARAMS = netbox_object.check_plugin_netbox_object.check_default_parameters
+
+
+@pytest.mark.parametrize('string_table, result', [
+    ([], None),
+    (SAMPLE_STRING_TABLE, SAMPLE_SECTION),
+])
+def test_parse_netbox_object(string_table, result):
+    assert netbox_object.parse_netbox_object(string_table) == result
+
+
+def test_discovery_netbox_object():
+    assert list(netbox_object.discovery_netbox_object(SAMPLE_SECTION)) == [Service()]
+
+
+@pytest.mark.parametrize('section, result', [
+    (SAMPLE_SECTION, [
+        Result(state=State.OK, summary='Device status: Active'),
+        Result(state=State.OK, summary='Site: HQ'),
+    ]),
+    ({'type': 'virtual_machine', 'id': 3, 'status': {'value': 'failed', 'label': 'Failed'}, 'site': None}, [
+        Result(state=State.CRIT, summary='Virtual machine status: Failed'),
+    ]),
+    ({'type': 'device', 'id': 4, 'status': {'value': 'custom', 'label': 'Custom'}, 'site': None}, [
+        Result(state=State.UNKNOWN, summary='Device status: Custom'),
+    ]),
+])
+def test_check_netbox_object(section, result):
+    assert list(netbox_object.check_netbox_object(DEFAULT_PARAMS, section)) == result
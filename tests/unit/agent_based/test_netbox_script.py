@@ -21,6 +21,7 @@
 
 import pytest  # type: ignore[import]
 import datetime
+from dataclasses import replace
 from freezegun import freeze_time
 from cmk.base.plugins.agent_based.agent_based_api.v1 import (
     Metric,
@@ -36,15 +37,20 @@ SAMPLE_STRING_TABLE = [
     ["DeviceConnectionsReport", "test_power_connections", "completed", "2024-07-01T06:00:02.842382+02:00", "0", "76", "0", "0"],
 ]
 
+SAMPLE_JSON_STRING_TABLE = [
+    ['{"name": "DeviceConnectionsReport", "status": "completed", "completed": "2024-07-01T06:00:02.842382+02:00", "tests": {"test_power_connections": [0, 76, 0, 0]}}'],
+]
+
 SAMPLE_SECTION = {
-    'DeviceConnectionsReport': {
-        'last_run': datetime.datetime(2024, 7, 1, 6, 0, 2, 842382),
-        'name': 'DeviceConnectionsReport',
-        'state': 'completed',
-        'tests': {
-            'test_power_connections': {'failure': 0, 'info': 0, 'success': 76, 'warning': 0},
+    'DeviceConnectionsReport': netbox_script.Script(
+        name='DeviceConnectionsReport',
+        state='completed',
+        last_run=datetime.datetime(2024, 7, 1, 6, 0, 2, 842382),
+        tests={
+            'test_power_connections': netbox_script.Counters(info=0, success=76, warning=0, failure=0),
         },
-    },
+        totals=netbox_script.Counters(info=0, success=76, warning=0, failure=0),
+    ),
 }
 
 
@@ -54,6 +60,51 @@ SAMPLE_SECTION = {
         SAMPLE_STRING_TABLE,
         SAMPLE_SECTION
     ),
+    (
+        SAMPLE_JSON_STRING_TABLE,
+        SAMPLE_SECTION
+    ),
+    (
+        [['{"name": "DeviceConnectionsReport", "status": "completed", "completed": "2024-07-01T06:00:02.842382+02:00", "runtime": 2.5, "queue_wait": 0.8}']],
+        {'DeviceConnectionsReport': netbox_script.Script(
+            name='DeviceConnectionsReport',
+            state='completed',
+            last_run=datetime.datetime(2024, 7, 1, 6, 0, 2, 842382),
+            runtime=2.5,
+            queue_wait=0.8,
+        )},
+    ),
+    (
+        [['{"name": "NotRun"}']],
+        {'NotRun': netbox_script.Script(name='NotRun')},
+    ),
+    (
+        SAMPLE_STRING_TABLE + [
+            ["DeviceConnectionsReport", "test_console_connections", "completed", "2024-07-01T06:00:02.842382+02:00", "1", "20", "2", "3"],
+        ],
+        {'DeviceConnectionsReport': replace(
+            SAMPLE_SECTION['DeviceConnectionsReport'],
+            tests={
+                'test_power_connections': netbox_script.Counters(info=0, success=76, warning=0, failure=0),
+                'test_console_connections': netbox_script.Counters(info=1, success=20, warning=2, failure=3),
+            },
+            totals=netbox_script.Counters(info=1, success=96, warning=2, failure=3),
+        )},
+    ),
+    (
+        [['{"cached": 1719806402.5}']] + SAMPLE_JSON_STRING_TABLE,
+        {'DeviceConnectionsReport': replace(
+            SAMPLE_SECTION['DeviceConnectionsReport'],
+            cached=datetime.datetime.fromtimestamp(1719806402.5),
+        )},
+    ),
+    (
+        [['@cached', '1719806402.5']] + SAMPLE_STRING_TABLE,
+        {'DeviceConnectionsReport': replace(
+            SAMPLE_SECTION['DeviceConnectionsReport'],
+            cached=datetime.datetime.fromtimestamp(1719806402.5),
+        )},
+    ),
 ])
 def test_parse_netbox_script(string_table, result):
     assert netbox_script.parse_netbox_script(string_table) == result
@@ -83,6 +134,27 @@ def test_discovery_netbox_script(section, result):
         Metric('test_warning', 0.0),
         Metric('test_failure', 0.0),
     ]),
+    ({'DeviceConnectionsReport': replace(SAMPLE_SECTION['DeviceConnectionsReport'], cached=datetime.datetime(2024, 7, 2, 5, 55))},
+     {'cache_age': ('fixed', (1800.0, 7200.0))}, [
+        Result(state=State.WARN, summary='Netbox unavailable, data age: 1 hour 0 minutes (warn/crit at 30 minutes 0 seconds/2 hours 0 minutes)'),
+        Result(state=State.OK, summary='Last Run: 1 day 0 hours'),
+        Metric('test_info', 0.0),
+        Metric('test_success', 76.0),
+        Metric('test_warning', 0.0),
+        Metric('test_failure', 0.0),
+    ]),
+    ({'DeviceConnectionsReport': replace(SAMPLE_SECTION['DeviceConnectionsReport'], runtime=700.0, queue_wait=12.0)},
+     {'runtime': ('fixed', (600.0, 1800.0))}, [
+        Result(state=State.OK, summary='Last Run: 1 day 0 hours'),
+        Result(state=State.WARN, summary='Runtime: 11 minutes 40 seconds (warn/crit at 10 minutes 0 seconds/30 minutes 0 seconds)'),
+        Metric('netbox_script_runtime', 700.0, levels=(600.0, 1800.0)),
+        Result(state=State.OK, notice='Queue wait: 12 seconds'),
+        Metric('netbox_script_queue_wait', 12.0),
+        Metric('test_info', 0.0),
+        Metric('test_success', 76.0),
+        Metric('test_warning', 0.0),
+        Metric('test_failure', 0.0),
+    ]),
 ])
 def test_check_netbox_script(section, params, result):
     assert list(netbox_script.check_netbox_script('DeviceConnectionsReport', params, section)) == result
@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import os
+import subprocess
+import sys
+import time
+from argparse import ArgumentTypeError
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest  # type: ignore[import]
+import requests
+from cmk_addons.plugins.netbox.lib import cache, transport
+from cmk_addons.plugins.netbox.lib.agent import AgentNetbox, Section, NameFilter, job_durations, portable_regex, next_scheduled_run, shard_argument, shard_of, write_sections
+from cmk_addons.plugins.netbox.lib.transport import TimeBudgetExceeded
+
+URL = 'https://netbox.example.com/api'
+
+
+@pytest.fixture
+def agent():
+    agent = AgentNetbox()
+    return agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--page-size', '2']))
+
+
+@pytest.mark.parametrize('count', [0, 1, 2, 3, 5])
+def test_paginate(agent, requests_mock, count):
+    objects = [dict(id=i, name=f'Script{i}', description='unused') for i in range(count)]
+
+    def page(request, context):
+        offset = int(request.qs.get('offset', ['0'])[0])
+        limit = int(request.qs['limit'][0])
+        next = None
+        if offset + limit < count:
+            next = f'{URL}/extras/scripts/?limit={limit}&offset={offset + limit}'
+        return dict(count=count, next=next, previous=None, results=objects[offset:offset + limit])
+
+    requests_mock.get(f'{URL}/extras/scripts/', json=page)
+
+    assert list(agent.paginate('extras/scripts/', ('id', 'name'))) == [dict(id=o['id'], name=o['name']) for o in objects]
+    assert requests_mock.call_count == max(1, (count + 1) // 2)
+    assert requests_mock.request_history[0].qs['fields'] == ['id,name']
+    assert agent.stats.summary()['endpoints']['extras/scripts/']['requests'] == requests_mock.call_count
+
+
+@pytest.mark.parametrize('remaining, timeout', [
+    (None, (5, 10)),
+    (60, (5, 10)),
+    (7, (5, 7)),
+    (3, (3, 3)),
+])
+def test_timeout(agent, remaining, timeout):
+    if remaining is not None:
+        agent.deadline = time.monotonic() + remaining
+    assert agent.timeout == pytest.approx(timeout, abs=0.1)
+
+
+def test_timeout_budget_exceeded(agent):
+    agent.deadline = time.monotonic() - 1
+    with pytest.raises(TimeBudgetExceeded):
+        agent.timeout
+
+
+def test_cached_section(agent, capsys, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+
+    def unavailable():
+        yield 'Script2'
+        raise requests.ConnectionError('Netbox is down')
+
+    with pytest.raises(requests.ConnectionError):
+        agent.cached_section('netbox_script', unavailable(), separator=',')
+
+    write_sections([agent.cached_section('netbox_script', ['Script1', 'Script2'], separator=',')])
+    assert capsys.readouterr().out == '<<<netbox_script:sep(44)>>>\nScript1\nScript2\n'
+
+    write_sections([agent.cached_section('netbox_script', unavailable(), separator=',')])
+    records, cached = cache.SectionCache(URL, 'netbox_script').load()
+    assert capsys.readouterr().out == f'<<<netbox_script:sep(44)>>>\n@cached,{cached}\nScript1\nScript2\n'
+
+
+@pytest.mark.parametrize('name, mode, prefix, piggyback', [
+    (None, 'prefix', '', None),
+    (None, 'piggyback', '', None),
+    ('eu', 'prefix', 'eu/', None),
+    ('eu', 'piggyback', '', 'eu'),
+])
+def test_setup_instance(name, mode, prefix, piggyback):
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--instance-mode', mode]), name)
+    assert (agent.prefix, agent.piggyback) == (prefix, piggyback)
+    assert (agent.script_prefix, agent.data_source_prefix) == (prefix, prefix)
+
+
+@pytest.mark.parametrize('name, mode, script_prefix, data_source_prefix', [
+    (None, 'piggyback', '', ''),
+    ('eu', 'prefix', 'eu/', 'eu/'),
+    ('eu', 'piggyback', 'eu/', ''),
+])
+def test_setup_instance_piggyback_host(name, mode, script_prefix, data_source_prefix):
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--instance-mode', mode, '--piggyback-scripts', 'netbox']), name)
+    assert (agent.script_prefix, agent.data_source_prefix) == (script_prefix, data_source_prefix)
+
+
+def test_query_instances_same_object(capsys, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    agents = []
+    for name, site in ((None, 'HQ'), ('eu', 'EU')):
+        agent = AgentNetbox()
+        agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--instance-mode', 'piggyback']), name)
+        section = Section('netbox_object', [dict(type='device', id=1, status='active', site=site)], as_json=True, host='sw1')
+        monkeypatch.setattr(agent, 'collect', lambda agent=agent, section=section: agent.sections.append(section))
+        agents.append(agent)
+
+    agents[0].query_instances(agents)
+    out = capsys.readouterr().out
+    assert '"site": "HQ"' in out
+    assert '"site": "EU"' not in out
+
+
+def test_query_instances_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    agents = [AgentNetbox(), AgentNetbox()]
+    created = []
+    for agent in agents:
+        agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret']))
+        # The workers of collect() all use the session created beforehand.
+        monkeypatch.setattr(agent, 'collect', lambda agent=agent: created.append('client' in agent.__dict__))
+
+    agents[0].query_instances(agents)
+    assert created == [True, True]
+    assert agents[0].client.get_adapter(URL) is agents[0].http_cache
+
+
+def test_import_time():
+    '''The HTTP stack and the special agent helpers are only loaded once the agent runs.'''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import cmk_addons.plugins.netbox.lib.agent'],
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+        capture_output=True, text=True, check=True,
+    )
+    imported = {line.split('|')[-1].strip() for line in result.stderr.splitlines() if line.startswith('import time:')}
+    assert 'cmk_addons.plugins.netbox.lib.agent' in imported
+    assert not imported & {
+        'requests',
+        'urllib3',
+        'cmk.special_agents.v0_unstable.agent_common',
+        'cmk.special_agents.v0_unstable.argument_parsing',
+    }
+
+
+def test_main_collector_output(agent, capsys, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    cache.SpoolFile(URL).write('<<<netbox_script:sep(44)>>>\nScript1\n')
+
+    agent.main(agent.parse_arguments(['-U', URL, '-T', 'secret', '--collector-max-age', '60']))
+    assert capsys.readouterr().out == '<<<netbox_script:sep(44)>>>\nScript1\n'
+
+
+@pytest.mark.parametrize('include, exclude, name, result', [
+    (None, None, 'DhcpReport', True),
+    ('Report$', None, 'DhcpReport', True),
+    ('^Ip', None, 'DhcpReport', False),
+    (None, 'Dhcp', 'DhcpReport', False),
+    ('Report', 'Dhcp', 'IpAddressReport', True),
+])
+def test_name_filter(include, exclude, name, result):
+    assert NameFilter(include, exclude)(name) == result
+
+
+@pytest.mark.parametrize('pattern, result', [
+    (None, False),
+    ('Report', True),
+    ('^(Dhcp|Ip)[A-Z].*Report$', True),
+    (r'Report\.v2', True),
+    ('(?i)report', False),
+    (r'^Ip\d+', False),
+    ('(?<!Dhcp)Report', False),
+    ('(?P<kind>Dhcp)', False),
+])
+def test_portable_regex(pattern, result):
+    assert portable_regex(pattern) == result
+
+
+def test_script_filter_not_portable(requests_mock):
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--script-include', '(?i)^ip']))
+    requests_mock.get(f'{URL}/extras/scripts/', json=dict(count=2, next=None, previous=None, results=[
+        dict(id=1, name='DhcpReport'),
+        dict(id=2, name='IpAddressReport'),
+    ]))
+    jobs = Future()
+    jobs.set_result({})
+    agent.__dict__['script_jobs'] = jobs
+
+    # PostgreSQL rejects (?i), so the pattern is only applied locally.
+    assert list(agent.script_records()) == [dict(name='IpAddressReport')]
+    assert 'name__regex' not in requests_mock.request_history[0].qs
+
+
+def test_script_filters(requests_mock):
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--script-module', '3', '--script-module', '5',
+                                       '--script-include', 'Report', '--script-exclude', 'Dhcp']))
+    # Netbox may ignore the name filter, the agent matches the names again.
+    requests_mock.get(f'{URL}/extras/scripts/', json=dict(count=2, next=None, previous=None, results=[
+        dict(id=1, name='DhcpReport'),
+        dict(id=2, name='IpAddressReport'),
+    ]))
+    jobs = Future()
+    jobs.set_result({})
+    agent.__dict__['script_jobs'] = jobs
+
+    assert list(agent.script_records()) == [dict(name='IpAddressReport')]
+    assert requests_mock.request_history[0].qs['module_id'] == ['3', '5']
+    assert requests_mock.request_history[0].qs['name__regex'] == ['report']
+
+
+def data_source(id, last_updated, last_synced='2024-07-01T06:00:00+02:00'):
+    return dict(id=id, name=f'source{id}', description='', enabled=True, status=dict(value='completed'),
+                last_synced=last_synced, last_updated=last_updated, file_count=0)
+
+
+def incremental_agent(jobs, *options):
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--incremental', '--retries', '0', *options]))
+    future = Future()
+    future.set_result({object_id: dict(id=job_id) for object_id, job_id in jobs.items()})
+    agent.__dict__['data_source_jobs'] = future
+    return agent
+
+
+def test_get_data_sources_incremental(requests_mock, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    data_sources = {
+        1: data_source(1, '2024-07-01T06:00:00+02:00'),
+        2: data_source(2, '2024-07-01T07:00:00+02:00'),
+        3: data_source(3, '2024-07-01T05:00:00+02:00'),
+    }
+
+    def listing(request, context):
+        results = list(data_sources.values())
+        if 'id' in request.qs:
+            results = [data_sources[int(id)] for id in request.qs['id']]
+        elif 'last_updated__gte' in request.qs:
+            results = [data_sources[2]]
+        return dict(count=len(results), next=None, previous=None, results=results)
+
+    requests_mock.get(f'{URL}/core/data-sources/', json=listing)
+    first = incremental_agent({1: 10, 2: 20, 3: 30}).get_data_sources_incremental()
+    assert {id: data_source['job'] for id, data_source in first.items()} == {1: 10, 2: 20, 3: 30}
+
+    # Data source 2 was edited, data source 3 synced since.
+    data_sources[3] = data_source(3, '2024-07-01T05:00:00+02:00', last_synced='2024-07-02T06:00:00+02:00')
+    requests_mock.reset_mock()
+    second = incremental_agent({1: 10, 2: 20, 3: 31}).get_data_sources_incremental()
+    changed, synced = requests_mock.request_history
+    assert changed.qs['last_updated__gte'] == ['2024-07-01t07:00:00+02:00']
+    assert synced.qs['id'] == ['3']
+    assert second[3]['last_synced'] == '2024-07-02T06:00:00+02:00'
+    assert second[3]['job'] == 31
+
+    # Netbox is not reachable, the snapshot is used.
+    requests_mock.get(f'{URL}/core/data-sources/', status_code=503)
+    assert incremental_agent({1: 10, 2: 20, 3: 31}).get_data_sources_incremental() == second
+
+
+def test_get_data_sources_incremental_filters(requests_mock, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    requests_mock.get(f'{URL}/core/data-sources/', json=dict(count=1, next=None, previous=None, results=[
+        data_source(1, '2024-07-01T06:00:00+02:00'),
+    ]))
+    incremental_agent({}, '--data-source-enabled-only').get_data_sources_incremental()
+    incremental_agent({}).get_data_sources_incremental()
+
+    # A snapshot of the enabled data sources is not taken for all of them.
+    first, second = requests_mock.request_history
+    assert first.qs['enabled'] == ['true']
+    assert 'enabled' not in second.qs
+    assert 'last_updated__gte' not in second.qs
+    assert len(list(tmp_path.glob('*_data_sources*.json'))) == 2
+
+
+def test_data_source_filters(requests_mock):
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--data-source-enabled-only', '--data-source-exclude', '^test']))
+    requests_mock.get(f'{URL}/core/data-sources/', json=dict(count=3, next=None, previous=None, results=[
+        dict(id=1, name='test', description='', enabled=True, status='completed', last_synced=None, file_count=0),
+        dict(id=2, name='disabled', description='', enabled=False, status='completed', last_synced=None, file_count=0),
+        dict(id=3, name='configs', description='', enabled=True, status='completed', last_synced=None, file_count=1),
+    ]))
+    data_sources = Future()
+    data_sources.set_result(agent.get_data_sources())
+    agent.__dict__['data_source_list'] = data_sources
+
+    assert [record['name'] for record in agent.data_source_records()] == ['configs']
+    assert requests_mock.request_history[0].qs['enabled'] == ['true']
+
+
+def scheduled_job(id, minutes_ago, interval):
+    scheduled = datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)
+    return dict(id=id, status=dict(value='completed'), completed=scheduled.isoformat(),
+                scheduled=scheduled.isoformat(), interval=interval, data=dict(tests={}))
+
+
+@pytest.mark.parametrize('jobs, due_in', [
+    ({}, None),
+    ({1: dict(scheduled_job(1, 10, None), scheduled=None)}, None),
+    ({1: scheduled_job(1, 10, 60)}, 50 * 60),
+    ({1: scheduled_job(1, 10, 60), 2: scheduled_job(2, 10, 30)}, 20 * 60),
+    ({1: scheduled_job(1, 10, 5)}, -5 * 60),
+    # A run overdue by more than an interval and the grace is no longer scheduled.
+    ({1: scheduled_job(1, 30, 5)}, None),
+    ({1: scheduled_job(1, 30, 5), 2: scheduled_job(2, 10, 60)}, 50 * 60),
+])
+def test_next_scheduled_run(jobs, due_in):
+    if due_in is None:
+        assert next_scheduled_run(jobs) == 0
+    else:
+        assert next_scheduled_run(jobs) == pytest.approx(time.time() + due_in, abs=5)
+
+
+@pytest.mark.parametrize('jobs, polled', [
+    ({1: scheduled_job(7, 10, 60)}, False),
+    ({1: scheduled_job(7, 10, 5)}, True),
+    # A stale schedule does not stop the skip for the other scripts.
+    ({1: scheduled_job(7, 10, 60), 2: scheduled_job(8, 300, 60)}, False),
+])
+def test_get_latest_jobs_follow_schedule(requests_mock, monkeypatch, tmp_path, jobs, polled):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    cache.JobStore(URL, 'extras.script', 3600).merge(jobs, watermark=jobs[1]['completed'])
+    requests_mock.get(f'{URL}/core/jobs/', json=dict(count=0, next=None, previous=None, results=[]))
+
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--follow-schedule']))
+    assert agent.get_latest_jobs('extras.script', 'extras/scripts/') == jobs
+    assert requests_mock.called == polled
+
+
+def test_get_latest_jobs_first_sweep(requests_mock, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    history = [
+        dict(id=9 - n, object_id=object_id, status=dict(value='completed'), completed=f'2024-07-0{9 - n}T06:00:00+02:00')
+        for n, object_id in enumerate([1, 2, 1, 2, 2, 1])
+    ]
+
+    def jobs(request, context):
+        if 'id' in request.qs:
+            return dict(count=2, next=None, previous=None, results=[
+                dict(id=int(id), data=dict(tests=dict(test_a=[0, int(id), 0, 0]))) for id in request.qs['id']
+            ])
+        offset = int(request.qs.get('offset', ['0'])[0])
+        next = f'{URL}/core/jobs/?limit=2&offset={offset + 2}' if offset + 2 < len(history) else None
+        return dict(count=len(history), next=next, previous=None, results=history[offset:offset + 2])
+
+    requests_mock.get(f'{URL}/core/jobs/', json=jobs)
+    requests_mock.get(f'{URL}/extras/scripts/', json=dict(count=2, next=None, previous=None, results=[dict(id=1), dict(id=2)]))
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--page-size', '2']))
+    latest = agent.get_latest_jobs('extras.script', 'extras/scripts/', ('data',))
+
+    # The sweep stops on the first page, the data is only fetched for its two jobs.
+    assert {object_id: (job['id'], job['data']) for object_id, job in latest.items()} == {
+        1: (9, dict(tests=dict(test_a=[0, 9, 0, 0]))),
+        2: (8, dict(tests=dict(test_a=[0, 8, 0, 0]))),
+    }
+    sweeps = [request for request in requests_mock.request_history if request.path.endswith('/core/jobs/') and 'id' not in request.qs]
+    assert len(sweeps) == 1
+    assert 'data' not in sweeps[0].qs['fields'][0].split(',')
+    assert cache.JobStore(URL, 'extras.script', 3600).load() == latest
+
+
+def test_get_latest_jobs_known_job(requests_mock, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    jobs = {1: dict(scheduled_job(7, 60, None), data=dict(tests=dict(test_a=[0, 1, 0, 0])))}
+    cache.JobStore(URL, 'extras.script', 3600).merge(jobs, watermark=jobs[1]['completed'])
+    # Netbox includes the job completed at the watermark again.
+    requests_mock.get(f'{URL}/core/jobs/', json=dict(count=1, next=None, previous=None, results=[dict(jobs[1], object_id=1)]))
+
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--reconcile-interval', '0']))
+    assert agent.get_latest_jobs('extras.script', 'extras/scripts/', ('data',)) == jobs
+    assert requests_mock.call_count == 1
+    assert 'id' not in requests_mock.request_history[0].qs
+
+
+def test_get_latest_jobs_expired_store(requests_mock, monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    jobs = {1: scheduled_job(7, 60, None), 2: scheduled_job(8, 60, None)}
+    store = cache.JobStore(URL, 'extras.script', 3600)
+    store.merge(jobs, watermark=jobs[2]['completed'])
+    monkeypatch.setattr(time, 'time', lambda now=time.time(): now + 7200)
+
+    newer = dict(scheduled_job(9, 5, None), object_id=3)
+    requests_mock.get(f'{URL}/core/jobs/', json=dict(count=1, next=None, previous=None, results=[newer]))
+    requests_mock.get(f'{URL}/extras/scripts/', json=dict(count=2, next=None, previous=None, results=[dict(id=1), dict(id=3)]))
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret']))
+
+    # The expired store is not fetched again, only the jobs of script 2, which is gone, are dropped.
+    assert set(agent.get_latest_jobs('extras.script', 'extras/scripts/')) == {1, 3}
+    assert requests_mock.request_history[-1].qs['completed__after'] == [jobs[2]['completed'].lower()]
+    assert store.load().keys() == {1, 3}
+    assert not store.expired
+
+
+@pytest.mark.parametrize('value, result', [
+    ('1/1', (1, 1)),
+    ('2/4', (2, 4)),
+    ('0/4', None),
+    ('5/4', None),
+    ('2', None),
+])
+def test_shard_argument(value, result):
+    if result is None:
+        with pytest.raises(ArgumentTypeError):
+            shard_argument(value)
+    else:
+        assert shard_argument(value) == result
+
+
+def test_shard_of():
+    names = [f'Script{i}' for i in range(1000)]
+    shards = {name: shard_of(name, 4) for name in names}
+    assert all(shards[name] == shard_of(name, 4) for name in names)
+    assert all(180 < list(shards.values()).count(shard) < 320 for shard in range(1, 5))
+
+    # A fifth shard only takes names over, the others stay where they are.
+    moved = [name for name in names if shard_of(name, 5) != shards[name]]
+    assert all(shard_of(name, 5) == 5 for name in moved)
+    assert 140 < len(moved) < 260
+
+
+def test_shard_records(requests_mock):
+    owned = []
+    for index in (1, 2, 3):
+        agent = AgentNetbox()
+        agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--shard', f'{index}/3']))
+        requests_mock.get(f'{URL}/extras/scripts/', json=dict(count=10, next=None, previous=None, results=[
+            dict(id=i, name=f'Script{i}') for i in range(10)
+        ]))
+        jobs = Future()
+        jobs.set_result({})
+        agent.__dict__['script_jobs'] = jobs
+        owned.extend(record['name'] for record in agent.script_records())
+    assert sorted(owned) == [f'Script{i}' for i in range(10)]
+
+
+GRAPHQL_URL = 'https://netbox.example.com/graphql/'
+
+GRAPHQL_DATA = dict(
+    script_list=[dict(id='3', name='DhcpReport')],
+    data_source_list=[dict(id='7', name='configs', description='Configs', enabled=True, status='COMPLETED',
+                           last_synced='2024-07-01T06:00:02+02:00', datafiles=[dict(id='1'), dict(id='2')])],
+)
+
+
+def test_graphql_objects(requests_mock):
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--api', 'graphql']))
+    requests_mock.post(GRAPHQL_URL, json=dict(data=GRAPHQL_DATA))
+    with ThreadPoolExecutor() as agent.executor:
+        scripts = list(agent.scripts())
+        data_sources = agent.get_data_sources()
+
+    assert scripts == [dict(id=3, name='DhcpReport')]
+    assert data_sources == [dict(
+        id=7, name='configs', description='Configs', enabled=True, status=dict(value='completed', label='Completed'),
+        last_synced='2024-07-01T06:00:02+02:00', file_count=2,
+    )]
+    assert requests_mock.call_count == 1
+    assert 'script_list' in requests_mock.request_history[0].json()['query']
+
+
+@pytest.mark.parametrize('response', [
+    dict(json=dict(data=None, errors=[dict(message='Cannot query field "datafiles"')])),
+    dict(status_code=500),
+    dict(exc=requests.ConnectTimeout),
+])
+def test_graphql_objects_fallback(requests_mock, response):
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--api', 'graphql', '--retries', '0']))
+    requests_mock.post(GRAPHQL_URL, **response)
+    requests_mock.get(f'{URL}/extras/scripts/', json=dict(count=1, next=None, previous=None, results=[dict(id=3, name='DhcpReport')]))
+    with ThreadPoolExecutor() as agent.executor:
+        scripts = list(agent.scripts())
+
+    # The scripts are listed with the REST API instead.
+    assert scripts == [dict(id=3, name='DhcpReport')]
+    assert agent.stats.summary()['endpoints']['graphql/']['errors'] == 1
+
+
+def test_section_job_queue(agent, requests_mock):
+    def jobs(request, context):
+        status = request.qs['status'][0]
+        results = [dict(id=9, created='2024-07-02T06:50:00+02:00')] if status == 'pending' else []
+        return dict(count=dict(pending=3, scheduled=12, running=2)[status], next=None, previous=None, results=results)
+
+    requests_mock.get(f'{URL}/core/jobs/', json=jobs)
+    requests_mock.get(f'{URL}/status/', json={'netbox-version': '4.0.0', 'rq-workers-running': 2})
+    with ThreadPoolExecutor() as agent.executor:
+        sections = agent.section_job_queue()
+
+    assert [section.records for section in sections] == [[dict(
+        name='netbox.example.com', pending=3, oldest_pending='2024-07-02T06:50:00+02:00', scheduled=12, running=2, workers=2,
+    )]]
+    assert all(request.qs['limit'] == ['1'] for request in requests_mock.request_history if 'jobs' in request.path)
+
+
+def test_section_job_queue_unavailable(agent, requests_mock):
+    requests_mock.get(f'{URL}/core/jobs/', status_code=503)
+    requests_mock.get(f'{URL}/status/', status_code=503)
+    agent.args.retries = 0
+    with ThreadPoolExecutor() as agent.executor:
+        assert agent.section_job_queue() == []
+
+
+@pytest.mark.parametrize('status_code, failures', [
+    (403, 0),
+    (404, 0),
+    (429, 1),
+    (503, 1),
+])
+def test_collect_circuit_breaker(requests_mock, monkeypatch, tmp_path, status_code, failures):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    monkeypatch.setattr(transport, 'CACHE_DIR', tmp_path)
+    agent = AgentNetbox()
+    agent.setup(agent.parse_arguments(['-U', URL, '-T', 'secret', '--retries', '0', '--breaker-threshold', '1']))
+    requests_mock.get(f'{URL}/core/jobs/', json=dict(count=0, next=None, previous=None, results=[]))
+    requests_mock.get(f'{URL}/core/data-sources/', json=dict(count=0, next=None, previous=None, results=[]))
+    requests_mock.get(f'{URL}/extras/scripts/', status_code=status_code)
+    with pytest.raises(requests.HTTPError):
+        agent.collect()
+
+    # Only an overloaded Netbox opens the breaker, a refused endpoint does not.
+    breaker = transport.CircuitBreaker(URL, 1, 300)
+    assert agent.stats.errors
+    assert breaker.state['failures'] == failures
+    assert breaker.is_open() is bool(failures)
+
+
+@pytest.mark.parametrize('job, result', [
+    (
+        dict(created='2024-07-02T06:00:00+02:00', scheduled=None,
+             started='2024-07-02T06:00:01.5+02:00', completed='2024-07-02T06:02:01.5+02:00'),
+        dict(runtime=120.0, queue_wait=1.5),
+    ),
+    (
+        dict(created='2024-07-01T06:00:00+02:00', scheduled='2024-07-02T06:00:00+02:00',
+             started='2024-07-02T06:00:03+02:00', completed='2024-07-02T06:00:05+02:00'),
+        dict(runtime=2.0, queue_wait=3.0),
+    ),
+    (
+        dict(started='2024-07-02T06:00:03+02:00', completed='2024-07-02T06:00:05+02:00'),
+        dict(runtime=2.0),
+    ),
+])
+def test_job_durations(job, result):
+    assert job_durations(job) == result
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import os
+import time
+
+import pytest  # type: ignore[import]
+import requests
+from cmk_addons.plugins.netbox.lib import cache
+from cmk_addons.plugins.netbox.lib.collector import CollectorNetbox
+
+URL = 'https://netbox.example.com/api'
+
+
+def poll(collector, agents):
+    print('<<<netbox_script:sep(0)>>>')
+    print('{"name": "Script1"}')
+
+
+def failed_poll(collector, agents):
+    print('<<<netbox_agent_stats:sep(0)>>>')
+    raise requests.ConnectionError('Netbox is down')
+
+
+@pytest.mark.parametrize('query_instances, spool', [
+    (poll, '<<<netbox_script:sep(0)>>>\n{"name": "Script1"}\n'),
+    # A failed poll keeps the last spool, which then ages out.
+    (failed_poll, 'last good poll\n'),
+])
+def test_collector_main(monkeypatch, tmp_path, query_instances, spool):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    cache.SpoolFile(URL).write('last good poll\n')
+    os.utime(cache.SpoolFile(URL).path, (time.time() - 600, time.time() - 600))
+    monkeypatch.setattr(CollectorNetbox, 'query_instances', query_instances)
+
+    collector = CollectorNetbox()
+    collector.main(collector.parse_arguments(['-U', URL, '-T', 'secret', '--once']))
+    assert cache.SpoolFile(URL).read(3600) == spool
+    assert (cache.SpoolFile(URL).read(300) is None) == (query_instances is failed_poll)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import json
+import pytest  # type: ignore[import]
+from cmk_addons.plugins.netbox.lib.jsonstream import PageStream
+
+SAMPLE_PAGE = {
+    'count': 3,
+    'next': 'https://netbox.example.com/api/core/jobs/?limit=3&offset=3',
+    'previous': None,
+    'results': [
+        {'id': 1, 'status': {'value': 'completed'}, 'data': {'log': ['ä' * 100] * 10, 'tests': {}}},
+        {'id': 2, 'status': {'value': 'failed'}, 'data': None},
+        {'id': 3, 'completed': '2024-07-01T06:00:02.842382+02:00', 'size': 12345678901234567890},
+    ],
+}
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64, 100000])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_page_stream(chunk_size, indent):
+    page = PageStream(chunked(json.dumps(SAMPLE_PAGE, indent=indent, ensure_ascii=False).encode(), chunk_size))
+
+    assert list(page) == SAMPLE_PAGE['results']
+    assert page.meta == {'count': 3, 'next': SAMPLE_PAGE['next'], 'previous': None}
+
+
+def test_page_stream_empty():
+    page = PageStream([b'{"count": 0, "next": null, "previous": null, "results": []}'])
+
+    assert list(page) == []
+    assert page.meta['next'] is None
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'{"count": 1, "results": [{"id": 1}',
+    b'{"results": [1 2]}',
+    b'[]',
+    b'{"results": []} []',
+])
+def test_page_stream_invalid(data):
+    with pytest.raises(ValueError):
+        list(PageStream(chunked(data, 4)))
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import hashlib
+import hmac
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest  # type: ignore[import]
+from cmk_addons.plugins.netbox.lib import cache
+from cmk_addons.plugins.netbox.lib.receiver import job_of_event, MAX_BODY, ReceiverNetbox, WebhookHandler
+
+URL = 'https://netbox.example.com/api'
+
+JOB = {
+    'id': 12,
+    'object_type': 'extras.script',
+    'object_id': 3,
+    'status': {'value': 'completed', 'label': 'Completed'},
+    'completed': '2024-07-01T06:00:02.842382+02:00',
+    'data': {'tests': {}},
+}
+
+
+@pytest.mark.parametrize('event, result', [
+    ({'event': 'job_completed', 'data': JOB}, JOB),
+    ({'event': 'job_failed', 'data': dict(JOB, status={'value': 'failed', 'label': 'Failed'})}, dict(JOB, status={'value': 'failed', 'label': 'Failed'})),
+    ({'event': 'job_started', 'data': dict(JOB, status={'value': 'running', 'label': 'Running'}, completed=None)}, None),
+    ({'event': 'job_completed', 'data': dict(JOB, object_type='dcim.device')}, None),
+    ({'event': 'updated', 'data': {'id': 1, 'name': 'sw1'}}, None),
+])
+def test_job_of_event(event, result):
+    assert job_of_event(event) == result
+
+
+def test_job_store_merge(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    store = cache.JobStore(URL, 'extras.script', 3600)
+
+    # Events are only merged into a store started by a poll.
+    assert store.merge({3: JOB}) == {}
+    assert store.load() == {}
+
+    store.merge({3: JOB, 4: dict(JOB, id=10, object_id=4)}, watermark=JOB['completed'])
+    newer = dict(JOB, id=15, completed='2024-07-02T06:00:00+02:00')
+    assert store.merge({3: newer}) == {3: newer, 4: dict(JOB, id=10, object_id=4)}
+    # An older job does not replace a newer one.
+    assert store.merge({3: JOB})[3] == newer
+
+    assert store.load()[3] == newer
+    assert store.watermark == JOB['completed']
+
+    # A job run by hand has a higher id than the scheduled job waiting
+    # meanwhile, the later completion wins.
+    manual = dict(JOB, id=20, completed='2024-07-02T07:00:00+02:00')
+    scheduled = dict(JOB, id=16, completed='2024-07-02T08:00:00+02:00')
+    assert store.merge({3: manual})[3] == manual
+    assert store.merge({3: scheduled})[3] == scheduled
+    assert store.merge({3: manual})[3] == scheduled
+
+
+@pytest.fixture
+def receiver(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, 'CACHE_DIR', tmp_path)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookHandler)
+    server.args = ReceiverNetbox().parse_arguments(['-U', URL, '--secret', 'secret'])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, body, headers):
+    request = urllib.request.Request(f'http://127.0.0.1:{server.server_port}/', data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_receiver_requires_secret():
+    with pytest.raises(SystemExit):
+        ReceiverNetbox().parse_arguments(['-U', URL])
+
+
+@pytest.mark.parametrize('signature, status, stored', [
+    (None, 403, False),
+    ('forged', 403, False),
+    (hmac.new(b'secret', json.dumps(dict(event='job_completed', data=JOB)).encode(), hashlib.sha512).hexdigest(), 204, True),
+])
+def test_receiver_signature(receiver, signature, status, stored):
+    cache.JobStore(URL, 'extras.script', 3600).merge({}, watermark=JOB['completed'])
+    headers = {'Content-Type': 'application/json'}
+    if signature is not None:
+        headers['X-Hook-Signature'] = signature
+
+    assert post(receiver, json.dumps(dict(event='job_completed', data=JOB)).encode(), headers) == status
+    assert (3 in cache.JobStore(URL, 'extras.script', 3600).load()) == stored
+
+
+@pytest.mark.parametrize('length, status', [
+    (str(MAX_BODY + 1), 413),
+    ('many', 400),
+    ('-1', 400),
+])
+def test_receiver_body_size(receiver, length, status):
+    # The size is checked before the body is read and its signature verified.
+    connection = http.client.HTTPConnection('127.0.0.1', receiver.server_port, timeout=5)
+    connection.putrequest('POST', '/')
+    connection.putheader('Content-Length', length)
+    connection.endheaders()
+    assert connection.getresponse().status == status
+    connection.close()
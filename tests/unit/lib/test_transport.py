@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8; py-indent-offset: 4 -*-
+#
+# checkmk_netbox - Checkmk extension for netbox
+#
+# Copyright (C) 2023-2024  Marius Rieder <marius.rieder@scs.ch>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest  # type: ignore[import]
+import requests
+from urllib3 import HTTPResponse
+from urllib3.util.retry import RequestHistory
+from cmk_addons.plugins.netbox.lib import transport
+from cmk_addons.plugins.netbox.lib.transport import RETRY_STATUS, BudgetRetry, CachingAdapter, TimeBudgetExceeded
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    '''Answer each request with the next of the queued responses of the server.'''
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        status, headers, body = self.server.responses.pop(0)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.setattr(transport, 'CACHE_DIR', tmp_path)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.responses = []
+    server.requests = []
+    server.url = f'http://127.0.0.1:{server.server_port}/api'
+    threading.Thread(target=server.serve_forever, kwargs=dict(poll_interval=0.05), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def session(adapter):
+    client = requests.Session()
+    client.mount('http://', adapter)
+    return client
+
+
+@pytest.mark.parametrize('retry_after, slept', [
+    (None, [1.0]),
+    ('2', [2]),
+    # A Retry-After beyond backoff_max is capped, with or without a deadline.
+    ('3600', [30]),
+])
+def test_budget_retry_sleep(monkeypatch, retry_after, slept):
+    sleeps = []
+    monkeypatch.setattr(transport.time, 'sleep', sleeps.append)
+    retry = BudgetRetry(total=3, backoff_factor=0.5, backoff_max=30, respect_retry_after_header=True)
+    retry = retry.new(history=(RequestHistory('GET', '/api/', None, 503, None),) * 2)
+    headers = {'Retry-After': retry_after} if retry_after else {}
+    retry.sleep(HTTPResponse(status=429, headers=headers))
+    assert sleeps == slept
+
+
+def test_budget_retry_deadline(monkeypatch):
+    monkeypatch.setattr(transport.time, 'sleep', pytest.fail)
+    retry = BudgetRetry(total=3, backoff_max=30, respect_retry_after_header=True, deadline=time.monotonic() + 5)
+    with pytest.raises(TimeBudgetExceeded):
+        retry.sleep(HTTPResponse(status=503, headers={'Retry-After': '10'}))
+
+
+def test_budget_retry_on_retry(server):
+    server.responses = [
+        (503, {'Retry-After': '0'}, b''),
+        (429, {'Retry-After': '0'}, b''),
+        (200, {'Content-Type': 'application/json'}, b'{}'),
+    ]
+    retried = []
+    retry = BudgetRetry(total=3, status_forcelist=RETRY_STATUS, respect_retry_after_header=True,
+                        raise_on_status=False, on_retry=retried.append)
+    response = session(CachingAdapter(server.url, max_retries=retry)).get(f'{server.url}/status/')
+
+    assert response.status_code == 200
+    assert retried == ['/api/status/', '/api/status/']
+    assert len(server.requests) == 3
+
+
+@pytest.mark.parametrize('validator, conditional', [
+    ({'ETag': '"v1"'}, ('If-None-Match', '"v1"')),
+    ({'Last-Modified': 'Mon, 01 Jul 2024 06:00:00 GMT'}, ('If-Modified-Since', 'Mon, 01 Jul 2024 06:00:00 GMT')),
+])
+def test_caching_adapter_revalidate(server, validator, conditional):
+    server.responses = [
+        (200, dict(validator, **{'Content-Type': 'application/json'}), b'{"count": 1}'),
+        (304, {}, b''),
+    ]
+    adapter = CachingAdapter(server.url)
+    client = session(adapter)
+
+    assert client.get(f'{server.url}/extras/scripts/').json() == {'count': 1}
+    # The 304 is answered with the stored body.
+    response = client.get(f'{server.url}/extras/scripts/')
+    assert (response.status_code, response.headers['Content-Type'], response.json()) == (200, 'application/json', {'count': 1})
+    assert server.requests[1][conditional[0]] == conditional[1]
+    assert (adapter.hits, adapter.misses) == (1, 1)
+
+
+def test_caching_adapter_without_validator(server):
+    server.responses = [
+        (200, {'Content-Type': 'application/json'}, b'{"count": 1}'),
+        (200, {'Content-Type': 'application/json'}, b'{"count": 2}'),
+    ]
+    adapter = CachingAdapter(server.url)
+    client = session(adapter)
+
+    assert client.get(f'{server.url}/extras/scripts/').json() == {'count': 1}
+    assert client.get(f'{server.url}/extras/scripts/').json() == {'count': 2}
+    assert 'If-None-Match' not in server.requests[1]
+    assert not adapter.directory.exists()
+
+
+def test_caching_adapter_offline(server):
+    server.responses = [(200, {'ETag': '"v1"', 'Content-Type': 'application/json'}, b'{"count": 1}')]
+    adapter = CachingAdapter(server.url)
+    client = session(adapter)
+    client.get(f'{server.url}/extras/scripts/').json()
+
+    adapter.offline = True
+    assert client.get(f'{server.url}/extras/scripts/').json() == {'count': 1}
+    with pytest.raises(requests.ConnectionError):
+        client.get(f'{server.url}/core/jobs/')
+    assert len(server.requests) == 1
+    assert adapter.hits == 1
+
+
+def test_caching_adapter_prune(server):
+    server.responses = [
+        (200, {'ETag': '"v1"', 'Content-Type': 'application/json'}, b'{"count": 1}'),
+        (200, {'ETag': '"v2"', 'Content-Type': 'application/json'}, b'{"count": 2}'),
+    ]
+    adapter = CachingAdapter(server.url)
+    client = session(adapter)
+    client.get(f'{server.url}/extras/scripts/').json()
+    client.get(f'{server.url}/core/jobs/').json()
+    old, recent = sorted(adapter.directory.iterdir(), key=lambda path: path.stat().st_mtime)
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+
+    adapter.prune(3600)
+    assert list(adapter.directory.iterdir()) == [recent]
+
+
+def test_caching_adapter_stream(server):
+    body = b'{"results": [' + b','.join(b'%d' % n for n in range(1000)) + b']}'
+    server.responses = [
+        (200, {'ETag': '"v1"', 'Content-Type': 'application/json'}, body),
+        (304, {}, b''),
+    ]
+    client = session(CachingAdapter(server.url))
+
+    # The body is stored while it is streamed in chunks, like the agent reads pages.
+    for _ in range(2):
+        with client.get(f'{server.url}/core/jobs/', stream=True) as response:
+            assert b''.join(response.iter_content(256)) == body